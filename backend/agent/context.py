@@ -0,0 +1,172 @@
+"""
+agent/context.py
+----------------
+Token-budgeted prompt assembly for generate_answer.
+
+WHY:
+  Chunks are split with CHUNK_OVERLAP=200, so two adjacent chunks of the
+  same file repeat up to 200 characters verbatim, and the whole session
+  history was appended with no token accounting. Every extra prompt token
+  costs money and generation latency.
+
+How the budget is filled (PROMPT_TOKEN_BUDGET, counted with tiktoken):
+  1. Reranked chunks in rank order. Chunks from the same source_file that
+     overlap are stitched into one passage first, so shared text is sent once.
+  2. Recent history, newest turn first, with whatever budget is left.
+"""
+
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Tuple
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import tiktoken
+from langchain_core.messages import BaseMessage
+
+from config import get_settings
+from core.logging import setup_logger
+
+logger   = setup_logger(__name__)
+settings = get_settings()
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+MESSAGE_OVERHEAD_TOKENS = 4      # role/formatting tokens per chat message
+
+
+# ── Token counting ────────────────────────────────────────────────────────────
+
+@lru_cache
+def get_encoding():
+    try:
+        return tiktoken.encoding_for_model(settings.CHAT_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = get_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+# ── Overlap merging ───────────────────────────────────────────────────────────
+
+def _overlap(left: str, right: str, min_chars: int) -> int:
+    """
+    Length of the longest suffix of `left` that is also a prefix of
+    `right` (0 if shorter than min_chars).
+    """
+    if min(len(left), len(right)) < min_chars:
+        return 0
+    probe = right[:min_chars]
+    start = max(0, len(left) - len(right))
+    pos = left.find(probe, start)
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(probe, pos + 1)
+    return 0
+
+
+def _merge_pair(a: str, b: str, min_chars: int):
+    """Merged text of two chunks if one contains or overlaps the other, else None."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    n = _overlap(a, b, min_chars)
+    if n:
+        return a + b[n:]
+    n = _overlap(b, a, min_chars)
+    if n:
+        return b + a[n:]
+    return None
+
+
+def merge_overlapping(docs: List[dict], min_chars: int = None) -> List[dict]:
+    """
+    Stitches overlapping chunks of the same source_file into one passage.
+
+    Order follows the best-ranked member of each passage, so the merged list
+    keeps the reranker's priority. Non-overlapping chunks pass through as-is.
+    """
+    min_chars = min_chars or settings.CONTEXT_MIN_OVERLAP_CHARS
+    passages: List[dict] = []
+
+    for rank, doc in enumerate(docs):
+        passage = {**doc, "_rank": rank}
+        # Rescan after every merge: a new chunk can bridge two passages
+        # that did not overlap each other.
+        i = 0
+        while i < len(passages):
+            other = passages[i]
+            if other["source_file"] == passage["source_file"]:
+                combined = _merge_pair(other["content"], passage["content"], min_chars)
+                if combined is not None:
+                    passages.pop(i)
+                    best = other if other["_rank"] <= passage["_rank"] else passage
+                    passage = {**best, "content": combined}
+                    i = 0
+                    continue
+            i += 1
+        passages.append(passage)
+
+    passages.sort(key=lambda p: p["_rank"])
+    return [{k: v for k, v in p.items() if k != "_rank"} for p in passages]
+
+
+# ── Budgeted assembly ─────────────────────────────────────────────────────────
+
+def _format_chunk(doc: dict) -> str:
+    return f"[Source: {doc['source_file']}]\n{doc['content']}"
+
+
+def build_context(docs: List[dict], history: List[BaseMessage],
+                  budget: int = None) -> Tuple[str, List[BaseMessage], dict]:
+    """
+    Returns (context, history, stats) fitting `budget` tokens in total.
+
+    Chunks take priority over history. The best chunk is truncated rather
+    than dropped if it alone exceeds the budget; lower-ranked chunks that do
+    not fit are skipped.
+    """
+    budget    = budget or settings.PROMPT_TOKEN_BUDGET
+    passages  = merge_overlapping(docs)
+    sep_cost  = count_tokens(CHUNK_SEPARATOR)
+    remaining = budget
+    parts: List[str] = []
+
+    for doc in passages:
+        text = _format_chunk(doc)
+        cost = count_tokens(text) + (sep_cost if parts else 0)
+        if cost > remaining:
+            if parts:
+                continue
+            text = truncate_tokens(text, remaining)
+            cost = remaining
+        parts.append(text)
+        remaining -= cost
+
+    kept: List[BaseMessage] = []
+    for message in reversed(history):
+        cost = count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+        if cost > remaining:
+            break
+        kept.append(message)
+        remaining -= cost
+    kept.reverse()
+
+    stats = {
+        "chunks_in"      : len(docs),
+        "passages"       : len(passages),
+        "passages_used"  : len(parts),
+        "history_in"     : len(history),
+        "history_used"   : len(kept),
+        "tokens"         : budget - remaining,
+    }
+    return CHUNK_SEPARATOR.join(parts), kept, stats
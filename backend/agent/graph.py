@@ -14,8 +14,8 @@ Graph topology:
        ↓
     generate_answer
        ↓
-    should_retry? ──── YES (iteration < 1) ──→ retrieve_documents
-       ↓ NO
+    should_retry? ──── YES (low confidence, within budget) ──→ retrieve_documents
+       ↓ NO                                   (wider k, unseen chunks only)
      [END]
 WHY Langgraph over a plain chain:
     - Conditional edges enable retry logic - impossible in a liner chain
@@ -31,7 +31,6 @@ from agent.nodes import(
     rerank_documents,
     generate_answer,
 )
-from agent.prompts import LOW_CONFIDENCE_PHRASES
 from core.logging import setup_logger
 
 logger = setup_logger(__name__)
@@ -43,23 +42,18 @@ def should_retry(state: AgentState) -> str:
     Router called after generate_answer.
     Returns "retry" to look back to retrieval, or "end" to finish.
 
-    Retry conditions:
+    The decision itself is made in generate_answer (see nodes.plan_retry):
         - Answer contains a low-confidence phrase
-        - And we haven't already retried (max 1 retry)
+        - And retries < AGENT_MAX_RETRIES
+        - And the request's token and latency budgets are not exhausted
     """
-    answer = state.get("answer", "")
     iterations = state.get("iteration_count", 0)
 
-    answer_lower = answer.lower()
-    is_low_confidence = any(
-        phrase in answer_lower for phrase in LOW_CONFIDENCE_PHRASES
-    )
-
-    if is_low_confidence and iterations < 2:
-        logger.info(f"Low confidence detected - retrying retrieval (iteration{iterations})")
+    if state.get("retry_pending"):
+        logger.info("Low confidence detected - retrying retrieval (iteration %d)", iterations)
         return "retry"
-    
-    logger.info(f"Answer accepted - finishing (iteration{iterations})")
+
+    logger.info("Answer accepted - finishing (iteration %d)", iterations)
     return "end"
 
 # ── Build Graph ───────────────────────────────────────────────────────────────
@@ -71,7 +65,7 @@ def build_agent():
 
     Usage:
          agent = build_agent()
-         result = agent.invoke(initial_state)
+         result = await agent.ainvoke(initial_state)
     """
     graph = StateGraph(AgentState)
 
@@ -94,7 +88,7 @@ def build_agent():
         "generate_answer",
         should_retry,
         {
-            "retry": "retrieve_documents",   # Loop back with broader query
+            "retry": "retrieve_documents",   # Loop back with wider search
             "end": END,                      # Done - return result to caller
         }
     )
@@ -2,26 +2,34 @@
 agent/nodes.py
 --------------
 Individual node functions for the LangGraph agent graph.
+
+All nodes are async: LLM, retriever and reranker calls use their async
+APIs, so a slow OpenAI call yields the event loop instead of blocking
+the whole uvicorn worker. Run the graph with `await agent.ainvoke(...)`.
 """
 
 import sys
+import time
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from typing import Any
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain.schema import Document                    # ← THIS was missing
 
 from models.state import AgentState
+from agent.context import build_context, count_tokens
 from agent.prompts import (
-    SYSTEM_PROMPT, INTENT_PROMPT, ANSWER_PROMPT,
+    SYSTEM_PROMPT, INTENT_PROMPT, ANSWER_PROMPT, SUMMARY_CONTEXT,
     LOW_CONFIDENCE_PHRASES, ESCALATION_KEYWORDS
 )
 from rag.retriever import get_retriever
 from rag.reranker import get_reranker
+from rag.intent_classifier import CentroidIntentClassifier
+from rag.store import chunk_id
 from config import get_settings
 from core.logging import setup_logger
+from core.metrics import timed_node, llm_metrics, token_usage, AGENT_RETRIES
 
 logger   = setup_logger(__name__)
 settings = get_settings()
@@ -32,80 +40,130 @@ llm = ChatOpenAI(
     temperature=settings.TEMPERATURE,
     max_tokens=settings.MAX_TOKENS,
     openai_api_key=settings.OPENAI_API_KEY,
+    stream_usage=True,          # usage_metadata on streamed calls too (token metrics)
+    callbacks=[llm_metrics],
 )
 retriever = get_retriever()
 reranker  = get_reranker()
 
+VALID_INTENTS = [
+    "plans_pricing", "billing", "network",
+    "sim_activation", "roaming", "refund_cancellation", "general"
+]
+
+intent_classifier = CentroidIntentClassifier(VALID_INTENTS, margin=settings.INTENT_CENTROID_MARGIN)
+
 
 # ── NODE 1: Classify Intent ───────────────────────────────────
 
-def classify_intent(state: AgentState) -> dict:
+@timed_node("classify_intent")
+async def classify_intent(state: AgentState) -> dict:
     """
     Classifies user query into a telecom support category.
-    Prepends intent to retrieval query for better precision.
+    The intent scopes retrieval to matching chunks via a metadata filter.
+
+    With INTENT_CLASSIFIER="centroid" the query embedding is matched against
+    per-category centroids first; the LLM is only called when that is ambiguous.
     """
     query = state["user_query"]
-    logger.info(f"Classifying intent for: '{query[:60]}'")
+    logger.info("Classifying intent for: '%.60s'", query)
+
+    if settings.INTENT_CLASSIFIER == "centroid":
+        intent, margin = await intent_classifier.aclassify(query)
+        if intent:
+            logger.info("Intent: %s (centroid, margin=%.3f)", intent, margin)
+            return {"intent": intent}
+        logger.info("Centroid margin %.3f too small — asking LLM", margin)
 
     prompt   = INTENT_PROMPT.format(query=query)
-    response = llm.invoke([HumanMessage(content=prompt)])
+    response = await llm.ainvoke([HumanMessage(content=prompt)])
     intent   = response.content.strip().lower()
 
-    valid_intents = [
-        "plans_pricing", "billing", "network",
-        "sim_activation", "roaming", "refund_cancellation", "general"
-    ]
-
-    if intent not in valid_intents:
+    if intent not in VALID_INTENTS:
         intent = "general"
 
-    logger.info(f"Intent: {intent}")
-    return {"intent": intent}
+    logger.info("Intent: %s", intent)
+    return {"intent": intent, "tokens_used": state.get("tokens_used", 0) + token_usage(response)}
 
 
 # ── NODE 2: Retrieve Documents ────────────────────────────────
 
-def retrieve_documents(state: AgentState) -> dict:
+def _to_dict(doc: Document) -> dict:
+    source_file = doc.metadata.get("source_file", "Unknown")
+    return {
+        "id"          : chunk_id(source_file, doc.page_content),
+        "content"     : doc.page_content,
+        "source_file" : source_file,
+        "category"    : doc.metadata.get("category", "general"),
+    }
+
+
+@timed_node("retrieve_documents")
+async def retrieve_documents(state: AgentState) -> dict:
     """
     Retrieves relevant chunks from ChromaDB using MMR.
-    On retry, broadens the query.
+
+    The intent is pushed down as a metadata filter (category == intent),
+    so the search only scans that category and the raw query embedding
+    stays cacheable. If the filtered set is thin, it is topped up from an
+    unfiltered search.
+
+    On retry the search is unfiltered and progressively wider
+    (k and fetch_k grow with each iteration), and chunks already seen in
+    earlier iterations are skipped — they were scored already.
     """
     query     = state["user_query"]
-    intent    = state.get("intent", "general")
+    intent    = state.get("intent") or "general"
     iteration = state.get("iteration_count", 0)
-
-    enriched_query = query if iteration > 0 else f"[{intent}] {query}"
-
-    logger.info(f"Retrieving | Query: '{enriched_query[:80]}'")
-
-    docs: list[Document] = retriever.invoke(enriched_query)
-
-    retrieved = [
-        {
-            "content"     : doc.page_content,
-            "source_file" : doc.metadata.get("source_file", "Unknown"),
-            "category"    : doc.metadata.get("category", "general"),
-        }
-        for doc in docs
-    ]
-
-    logger.info(f"Retrieved {len(retrieved)} chunks")
+    seen_ids  = state.get("seen_ids", [])
+
+    where = {"category": intent} if intent != "general" and iteration == 0 else None
+
+    logger.info("Retrieving | Query: '%.80s' | Filter: %s | Iteration: %d", query, where, iteration)
+
+    if where:
+        docs: list[Document] = await retriever.ainvoke(query, filter=where)
+        if len(docs) < settings.RETRIEVER_MIN_FILTERED:
+            logger.info("Filtered set thin (%d) — topping up with unfiltered search", len(docs))
+            seen = {d.page_content for d in docs}
+            extra = [d for d in await retriever.ainvoke(query) if d.page_content not in seen]
+            docs = docs + extra[:settings.RETRIEVER_K - len(docs)]
+    elif iteration > 0:
+        k       = settings.RETRIEVER_K * (iteration + 1)
+        fetch_k = max(settings.RETRIEVER_FETCH_K * (iteration + 1), k + len(seen_ids))
+        docs    = await retriever.ainvoke(query, k=k + len(seen_ids), fetch_k=fetch_k)
+    else:
+        docs = await retriever.ainvoke(query)
+
+    seen = set(seen_ids)
+    retrieved = [d for d in map(_to_dict, docs) if d["id"] not in seen]
+    if iteration > 0:
+        retrieved = retrieved[:settings.RETRIEVER_K * (iteration + 1)]
+
+    logger.info("Retrieved %d new chunks (%d seen before)", len(retrieved), len(seen))
     return {
         "retrieved_docs"  : retrieved,
+        "seen_ids"        : seen_ids + [d["id"] for d in retrieved],
         "iteration_count" : iteration + 1,
     }
 
 
 # ── NODE 3: Rerank Documents ──────────────────────────────────
 
-def rerank_documents(state: AgentState) -> dict:
+@timed_node("rerank_documents")
+async def rerank_documents(state: AgentState) -> dict:
     """
     Reranks retrieved chunks for precision.
+
+    Only chunks not scored in an earlier iteration are sent to the
+    reranker; previous scores are reused and both sets compete for top_n.
+    LLM rerank tokens count towards AGENT_TOKEN_BUDGET.
     """
     retrieved = state["retrieved_docs"]
+    previous  = state.get("scored_docs", [])
     query     = state["user_query"]
 
-    if not retrieved:
+    if not retrieved and not previous:
         return {"reranked_docs": []}
 
     docs = [
@@ -119,58 +177,115 @@ def rerank_documents(state: AgentState) -> dict:
         for d in retrieved
     ]
 
-    reranked = reranker.rerank(query, docs)
-
-    reranked_dicts = [
-        {
-            "content"     : doc.page_content,
-            "source_file" : doc.metadata.get("source_file", "Unknown"),
-            "category"    : doc.metadata.get("category", "general"),
-        }
-        for doc in reranked
-    ]
+    scores, tokens = await reranker.ascore_with_usage(query, docs) if docs else ([], 0)
+    fresh  = [{**d, "rerank_score": float(score)} for d, score in zip(retrieved, scores)]
+    pool   = sorted(previous + fresh, key=lambda d: d["rerank_score"], reverse=True)
+    reranked_dicts = pool[:reranker.top_n]
 
-    logger.info(f"Reranked: {len(retrieved)} → {len(reranked_dicts)} chunks")
-    return {"reranked_docs": reranked_dicts}
+    logger.info(
+        "Reranked: %d new + %d reused → %d chunks | Top score: %.2f",
+        len(fresh), len(previous), len(reranked_dicts), reranked_dicts[0]["rerank_score"],
+    )
+    return {
+        "reranked_docs": reranked_dicts,
+        "scored_docs"  : pool,
+        "tokens_used"  : state.get("tokens_used", 0) + tokens,
+    }
 
 
 # ── NODE 4: Generate Answer ───────────────────────────────────
 
-def generate_answer(state: AgentState) -> dict:
+def is_low_confidence(answer: str) -> bool:
+    answer_lower = answer.lower()
+    return any(phrase.lower() in answer_lower for phrase in LOW_CONFIDENCE_PHRASES)
+
+
+def needs_escalation(query: str) -> bool:
+    query_lower = query.lower()
+    return any(kw in query_lower for kw in ESCALATION_KEYWORDS)
+
+
+def plan_retry(state: AgentState, answer: str, tokens_used: int) -> tuple:
+    """
+    Decide whether a low-confidence answer gets another retrieval pass.
+    Returns (retry, reason). Stops on max retries, token budget or latency budget.
+    """
+    if not is_low_confidence(answer):
+        return False, state.get("retry_reason")
+
+    elapsed_ms = (time.monotonic() - state.get("started_at", time.monotonic())) * 1000
+    if state.get("retry_count", 0) >= settings.AGENT_MAX_RETRIES:
+        AGENT_RETRIES.labels("max_retries").inc()
+        return False, "low_confidence: max retries reached"
+    if tokens_used >= settings.AGENT_TOKEN_BUDGET:
+        AGENT_RETRIES.labels("token_budget").inc()
+        return False, f"low_confidence: token budget exhausted ({tokens_used})"
+    if elapsed_ms >= settings.AGENT_LATENCY_BUDGET_MS:
+        AGENT_RETRIES.labels("latency_budget").inc()
+        return False, f"low_confidence: latency budget exhausted ({elapsed_ms:.0f}ms)"
+    AGENT_RETRIES.labels("retry").inc()
+    return True, "low_confidence"
+
+
+@timed_node("generate_answer")
+async def generate_answer(state: AgentState) -> dict:
     """
     Generates grounded answer using reranked context.
+
+    The prompt is assembled within PROMPT_TOKEN_BUDGET (see agent/context.py):
+    overlapping chunks are merged, chunks come first, then recent history.
+    A session summary (MEMORY_MODE=summary) is sent ahead of the history
+    and its tokens are taken out of the budget first.
+    Also decides whether to retry (see plan_retry); the turn is only
+    appended to the conversation once the answer is final.
     """
     docs  = state.get("reranked_docs") or state.get("retrieved_docs", [])
     query = state["user_query"]
 
-    context = "\n\n---\n\n".join([
-        f"[Source: {d['source_file']}]\n{d['content']}"
-        for d in docs
-    ])
+    summary = state.get("summary")
+    memory  = [SystemMessage(content=SUMMARY_CONTEXT.format(summary=summary))] if summary else []
+    budget  = settings.PROMPT_TOKEN_BUDGET - sum(count_tokens(m.content) for m in memory)
+
+    context, history, stats = build_context(docs, state.get("messages", []), budget=max(budget, 1))
 
     prompt = ANSWER_PROMPT.format(context=context, question=query)
 
     messages = [
         SystemMessage(content=SYSTEM_PROMPT),
-        *state.get("messages", []),
+        *memory,
+        *history,
         HumanMessage(content=prompt),
     ]
 
-    logger.info("Generating answer...")
-    response = llm.invoke(messages)
-    answer   = response.content.strip()
+    logger.info(
+        "Generating answer... | Context: %d/%d passages from %d chunks | "
+        "History: %d/%d messages | %d tokens",
+        stats["passages_used"], stats["passages"], stats["chunks_in"],
+        stats["history_used"], stats["history_in"], stats["tokens"],
+    )
+    response    = await llm.ainvoke(messages)
+    answer      = response.content.strip()
+    tokens_used = state.get("tokens_used", 0) + token_usage(response)
 
-    needs_escalation = any(kw in query.lower() for kw in ESCALATION_KEYWORDS)
+    escalate = needs_escalation(query)
 
-    if needs_escalation:
+    if escalate:
         logger.info("Escalation flag triggered")
 
+    retry, reason = plan_retry(state, answer, tokens_used)
+    if reason:
+        logger.info("Retry decision: %s | %s", "retry" if retry else "stop", reason)
+
     return {
         "answer"           : answer,
         "sources"          : docs,
-        "needs_escalation" : needs_escalation,
-        "messages"         : [
+        "needs_escalation" : escalate,
+        "tokens_used"      : tokens_used,
+        "retry_pending"    : retry,
+        "retry_reason"     : reason,
+        "retry_count"      : state.get("retry_count", 0) + int(retry),
+        "messages"         : [] if retry else [
             HumanMessage(content=query),
             AIMessage(content=answer),
         ],
-    }
\ No newline at end of file
+    }
@@ -38,7 +38,7 @@ You represent NovaTel's values: Fast resolution. Clear communication . Customer-
 # ── Intent Classification Prompt ──────────────────────────────────────────────
 
 # Short, precise prompt. We want a single-word answer - no explanation.
-# Prepending intent to retrieval query significantly improves chunk precision.
+# The intent becomes a category filter on retrieval, which improves chunk precision.
 
 INTENT_PROMPT = """Classify the customer's support query into exactly one category.
 
@@ -76,6 +76,28 @@ flag what requires specialist help
 
 ANSWER:"""
 
+# ── Conversation Summary (MEMORY_MODE=summary) ────────────────────────────────
+# Runs in the background after a response is sent. Folds older turns into a
+# running summary so they stop being replayed verbatim into every prompt.
+
+SUMMARY_PROMPT = """You maintain a running summary of a NovaTel support conversation.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW TURNS TO FOLD IN:
+{transcript}
+
+Rewrite the summary so it includes the new turns. Keep facts the agent may need
+later: the customer's plan, devices, account issues, what was already tried,
+prices or policies quoted, and any open requests. Drop greetings and filler.
+Write at most 150 words in plain prose.
+
+SUMMARY:"""
+
+# Injected after the system prompt when a session has a summary.
+SUMMARY_CONTEXT = "Summary of the earlier conversation with this customer:\n{summary}"
+
 # ── Low Confidence Detection ──────────────────────────────────────────────────
 # These phrases in the generated answer trigger a retry with broader retrieval.
 
@@ -1,50 +1,211 @@
 """
 api/middleware/rate_limit.py
 ----------------------------
-Simple in-memory rate limiter middleware.
+In-memory token-bucket rate limiter, as pure ASGI middleware.
 
-Limits: 30 requests per minute per IP address.
+Limits (config.py):
+    per IP      : RATE_LIMIT_IP_PER_MINUTE, bursts up to RATE_LIMIT_IP_BURST
+    per session : RATE_LIMIT_SESSION_PER_MINUTE, bursts up to RATE_LIMIT_SESSION_BURST
+    batch       : RATE_LIMIT_BATCH_QUERIES_PER_MINUTE per IP, bursts up to
+                  RATE_LIMIT_BATCH_BURST - one token per query in the batch
+Applies to the costly routes in RATE_LIMITED_PATHS (POST only).
 Production upgrade: Use Redis-backed rate limiting (slowapi + redis).
 
 WHY rate limiting:
     Prevents abuse and runaway OpenAI API costs.
     Each chat request costs ~$0.02 in tokens - 1000 requests = $2.
     A single bad actor could drain you API quota in minutes.
+
+WHY token buckets:
+    The old sliding-window log rebuilt a timestamp list per IP on every
+    request and never forgot an IP. A bucket is two floats per key and an
+    O(1) refill; keys live in an LRU dict capped at RATE_LIMIT_MAX_KEYS and
+    idle keys (whose bucket would be full again anyway) are dropped.
+
+WHY pure ASGI (not BaseHTTPMiddleware):
+    No per-request Request/Response wrapping or extra task, and streaming
+    responses pass straight through. The session id is read by peeking the
+    JSON body, which is then replayed to the app unchanged.
 """
 
+import json
 import time
-from collections import defaultdict
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config import get_settings
+
+settings = get_settings()
 
-# Per-IP request timestamps
-_request_log: dict[str, list] = defaultdict(list)
+RATE_LIMITED_PATHS = frozenset({"/chat", "/chat/stream", "/chat/batch"})
+BATCH_PATH = "/chat/batch"
+MAX_PEEK_BYTES = 64 * 1024              # Larger bodies are not parsed for a session id
+MAX_BATCH_PEEK_BYTES = 8 * 1024 * 1024  # Larger batch bodies are charged a full burst
 
-WINDOW_SECONDS = 60
-MAX_REQUESTS = 30
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class TokenBucketLimiter:
     """
-    Sliding window rate limiter.
-    Allows MAX_REQUESTS per IP per WINDOW_SECONDS.
+    One token bucket per key: `rate` tokens/second, capacity `burst`.
+
+    Not thread-safe by design - it runs on the event loop only.
     """
-    async def dispatch(self, request: Request, call_next):
-        # Only rate limit the /chat endpoint
-        if request.url.path != "/chat":
-            return await call_next(request)
-        
-        client_ip = request.client.host
-        now = time.time()
-        
-        # Remove timestamps outside the window
-        _request_log[client_ip] = [
-            ts for ts in _request_log[client_ip]
-            if now - ts < WINDOW_SECONDS
-        ]
-        if len(_request_log[client_ip]) >= MAX_REQUESTS:
-            raise HTTPException(
-                status_code=429,
-                detail=f"Rate limit exceeded. Max {MAX_REQUESTS} requests per minute."
-            )
-        _request_log[client_ip].append(now)
-        return await call_next(request)
\ No newline at end of file
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int, idle_seconds: float):
+        self.rate         = per_minute / 60.0
+        self.burst        = float(burst)
+        self.max_keys     = max_keys
+        self.idle_seconds = idle_seconds
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()   # key -> [tokens, last_seen]
+
+    def allow(self, key: str, now: float = None, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Take `cost` tokens (capped at the burst, so any request can pass
+        eventually). Returns (allowed, seconds until enough are available).
+        """
+        cost = min(cost, self.burst)
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [self.burst, now]
+            self._buckets[key] = bucket
+            self._evict(now)
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return True, 0.0
+        return False, (cost - bucket[0]) / self.rate
+
+    def _evict(self, now: float) -> None:
+        # LRU order == last-seen order: idle keys are always at the front,
+        # so this is amortized O(1) per request.
+        buckets = self._buckets
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+        while buckets:
+            key, (_, last_seen) = next(iter(buckets.items()))
+            if now - last_seen < self.idle_seconds:
+                break
+            del buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def _client_ip(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _payload(body: bytes, max_bytes: int) -> Optional[dict]:
+    if not body or len(body) > max_bytes:
+        return None
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _session_id(body: bytes) -> Optional[str]:
+    payload = _payload(body, MAX_PEEK_BYTES)
+    session_id = payload.get("session_id") if payload else None
+    return session_id if isinstance(session_id, str) else None
+
+
+def _batch_size(body: bytes) -> Optional[int]:
+    """Number of queries in a /chat/batch body, None if it cannot be read."""
+    payload = _payload(body, MAX_BATCH_PEEK_BYTES)
+    queries = payload.get("queries") if payload else None
+    return len(queries) if isinstance(queries, list) else None
+
+
+class RateLimitMiddleware:
+    """
+    Token-bucket limiter keyed by client IP and by session_id.
+    /chat/batch additionally draws one token per query from a per-IP
+    batch bucket, so a 500-query batch is not priced like one chat.
+    Register with app.add_middleware(RateLimitMiddleware).
+    """
+
+    def __init__(self, app, paths=RATE_LIMITED_PATHS):
+        self.app   = app
+        self.paths = frozenset(paths)
+        idle = settings.RATE_LIMIT_IDLE_SECONDS
+        self.by_ip = TokenBucketLimiter(
+            settings.RATE_LIMIT_IP_PER_MINUTE, settings.RATE_LIMIT_IP_BURST,
+            settings.RATE_LIMIT_MAX_KEYS, idle,
+        )
+        self.by_session = TokenBucketLimiter(
+            settings.RATE_LIMIT_SESSION_PER_MINUTE, settings.RATE_LIMIT_SESSION_BURST,
+            settings.RATE_LIMIT_MAX_KEYS, idle,
+        )
+        self.by_batch = TokenBucketLimiter(
+            settings.RATE_LIMIT_BATCH_QUERIES_PER_MINUTE, settings.RATE_LIMIT_BATCH_BURST,
+            settings.RATE_LIMIT_MAX_KEYS, idle,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+            or not settings.RATE_LIMIT_ENABLED
+        ):
+            return await self.app(scope, receive, send)
+
+        now = time.monotonic()
+        client_ip = _client_ip(scope)
+        allowed, retry_after = self.by_ip.allow(client_ip, now)
+        if not allowed:
+            return await self._reject(send, retry_after, "IP")
+
+        # Peek the body for the session id, then replay it to the app
+        messages, body = [], b""
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        if scope["path"] == BATCH_PATH:
+            # Unreadable bodies are rejected by validation anyway; oversized
+            # ones are charged the whole burst
+            size = _batch_size(body)
+            cost = size if size is not None else self.by_batch.burst
+            allowed, retry_after = self.by_batch.allow(client_ip, now, cost=max(1, cost))
+            if not allowed:
+                return await self._reject(send, retry_after, "IP (batch queries)")
+
+        session_id = _session_id(body)
+        if session_id is not None:
+            allowed, retry_after = self.by_session.allow(session_id, now)
+            if not allowed:
+                return await self._reject(send, retry_after, "session")
+
+        async def replay():
+            return messages.pop(0) if messages else await receive()
+
+        await self.app(scope, replay, send)
+
+    @staticmethod
+    async def _reject(send, retry_after: float, scope_name: str) -> None:
+        body = json.dumps({
+            "detail": f"Rate limit exceeded for this {scope_name}. Retry in {retry_after:.0f}s."
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, int(retry_after + 0.999))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
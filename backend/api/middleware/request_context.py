@@ -0,0 +1,41 @@
+"""
+api/middleware/request_context.py
+---------------------------------
+Assigns every HTTP request an id for log correlation.
+
+Uses the caller's X-Request-ID if present, otherwise generates one, stores
+it in core.logging.request_id_var for the duration of the request and
+echoes it back in the X-Request-ID response header. Pure ASGI, so it adds
+no per-request task or body buffering.
+"""
+
+import uuid
+
+from core.logging import request_id_var
+
+HEADER = b"x-request-id"
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = next(
+            (value.decode("latin-1")[:64] for name, value in scope["headers"] if name == HEADER),
+            None,
+        ) or uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -13,8 +13,11 @@ In production: protect these routes with API key auth middleware.
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from models.schemas import AdminStatsResponse
-from rag.retriever import get_vectorstore
+from rag.store import get_store
 from services.session_service import get_active_session_count
+from services.answer_cache import answer_cache
+from rag.embeddings import get_embedding_model
+from agent.nodes import intent_classifier
 from core.logging import setup_logger
 from config import get_settings
 
@@ -29,8 +32,8 @@ async def get_stats():
     Useful for monitoring dashboards.
     """
     try:
-        vectorstore = get_vectorstore()
-        total_chunks = vectorstore._collection.count()
+        store = get_store()
+        total_chunks = store.collection().count() if store.is_ready() else 0
     except Exception:
         total_chunks = 0
     
@@ -40,6 +43,8 @@ async def get_stats():
         embedding_model=settings.EMBEDDING_MODEL,
         chat_model=settings.CHAT_MODEL,
         active_sessions=get_active_session_count(),
+        answer_cache=answer_cache.stats(),
+        embedding_cache=get_embedding_model().stats(),
     )
 
 @router.post("/admin/reingest", tags=["Admin"])
@@ -53,8 +58,13 @@ async def reingest_documents(background_tasks: BackgroundTasks):
         try:
             from rag.ingestor import ingest
             logger.info("Background re-ingestion strarted")
-            ingest()
-            logger.info("Background re-ingestion complete")
+            summary = ingest()
+            intent_classifier.refresh()
+            logger.info(
+                f"Background re-ingestion complete | "
+                f"Embedded: {summary['embedded']} | Removed: {summary['removed']} | "
+                f"Total: {summary['total']}"
+            )
         except Exception as e:
             logger.error(f"Re-ingestion failed: {e}", exc_info=True)
 
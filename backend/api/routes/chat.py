@@ -4,37 +4,47 @@ api/routes/chat.py
 Chat endpoint — the primary API route of the application.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, BackgroundTasks
 from fastapi.responses import StreamingResponse
-import asyncio
+from starlette.background import BackgroundTask
 import json
 
-from models.schemas import ChatRequest, ChatResponse, SessionClearResponse
-from services.chat_service import process_chat
+from models.schemas import ChatRequest, ChatResponse, SessionClearResponse, BatchChatRequest
+from services.chat_service import process_chat, stream_chat, process_chat_batch
 from services.session_service import clear_session
-from core.exceptions import AgentInvocationError, VectorStoreNotReadyError
+from services.memory_service import summarize_session
+from core.exceptions import AgentInvocationError, VectorStoreNotReadyError, ServiceOverloadedError
 from core.logging import setup_logger
 
 logger = setup_logger(__name__)
 router = APIRouter()
 
 
+def overloaded(e: ServiceOverloadedError) -> HTTPException:
+    return HTTPException(status_code=503, detail=e.message, headers={"Retry-After": str(e.retry_after)})
+
+
 @router.post("/chat", response_model=ChatResponse, tags=["Chat"])
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
     """
     Process a customer support query through the RAG agent.
+    Session summarization (MEMORY_MODE=summary) runs after the response is sent.
     """
     try:
         response = await process_chat(
             session_id=request.session_id,
             message=request.message,
         )
+        background_tasks.add_task(summarize_session, request.session_id)
         return response
 
     except VectorStoreNotReadyError as e:
         logger.error("Vector store not ready")
         raise HTTPException(status_code=503, detail=e.message)
 
+    except ServiceOverloadedError as e:
+        raise overloaded(e)
+
     except AgentInvocationError as e:
         logger.error(f"Agent error: {e.message}")
         raise HTTPException(status_code=500, detail=e.message)
@@ -43,60 +53,75 @@ async def chat(request: ChatRequest):
         logger.error(f"Unexpected error in /chat: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
     
-# ── Streaming Chat Endpoint (NEW — does NOT affect existing /chat) ──
+# ── Streaming Chat Endpoint ──────────────────────────────────────────────────
 
 @router.post("/chat/stream", tags=["Chat"])
 async def chat_stream(request: ChatRequest):
+    """
+    Stream the agent's answer as newline-delimited JSON (NDJSON).
+    See services.chat_service.stream_chat for the event shapes.
 
-    async def token_generator():
+    The first event is awaited before the response starts, so a shed
+    request gets a real 503 + Retry-After instead of a 200 stream.
+    """
+    events = stream_chat(session_id=request.session_id, message=request.message)
+    first, first_error = None, None
+    try:
+        first = await events.__anext__()
+    except ServiceOverloadedError as e:
+        raise overloaded(e)
+    except StopAsyncIteration:
+        pass
+    except Exception as e:
+        first_error = e
 
+    async def event_generator():
         try:
+            if first_error is not None:
+                raise first_error
+            if first is not None:
+                yield json.dumps(first) + "\n"
+                async for event in events:
+                    yield json.dumps(event) + "\n"
 
-            response = await process_chat(
-                session_id=request.session_id,
-                message=request.message,
-            )
-
-            answer = response.answer
-            sources = response.sources
+        except VectorStoreNotReadyError as e:
+            logger.error("Vector store not ready")
+            yield json.dumps({"error": e.message}) + "\n"
 
-            # FIX: convert sources to JSON-safe format
-            serialized_sources = [
-                {
-                    "source": getattr(s, "source", None),
-                    "score": getattr(s, "score", None),
-                    "content": getattr(s, "content", None),
-                }
-                for s in sources
-            ]
+        except Exception as e:
+            logger.error(f"Streaming error: {e}", exc_info=True)
+            yield json.dumps({"error": str(e)}) + "\n"
 
-            for word in answer.split():
+    return StreamingResponse(
+        event_generator(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(summarize_session, request.session_id),
+    )
 
-                yield json.dumps({
-                    "token": word + " "
-                }) + "\n"
 
-                await asyncio.sleep(0.02)
+# ── Batch Chat Endpoint ──────────────────────────────────────────────────────
 
-            yield json.dumps({
-                "done": True,
-                "sources": serialized_sources
-            }) + "\n"
+@router.post("/chat/batch", tags=["Chat"])
+async def chat_batch(request: BatchChatRequest):
+    """
+    Run many queries through the agent and stream one NDJSON line per query
+    (models.schemas.BatchChatResult) as each finishes.
+    See services.chat_service.process_chat_batch.
+    """
 
+    async def result_generator():
+        try:
+            async for result in process_chat_batch(request.queries):
+                yield result.model_dump_json() + "\n"
         except Exception as e:
-
-            logger.error(
-                f"Streaming error: {e}",
-                exc_info=True
-            )
-
-            yield json.dumps({
-                "error": str(e)
-            }) + "\n"
+            logger.error(f"Batch error: {e}", exc_info=True)
+            yield json.dumps({"error": str(e)}) + "\n"
 
     return StreamingResponse(
-        token_generator(),
-        media_type="application/json"
+        result_generator(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -1,17 +1,25 @@
 """
 api/routes/health.py
 --------------------
-Health check endpoint.
+Health check endpoints.
+
+Routes:
+    GET /health/live   -- liveness: the process is serving (no I/O)
+    GET /health/ready  -- readiness snapshot, 503 until ready
+    GET /health        -- legacy summary used by the frontend
+
+/health and /health/ready never touch Chroma or OpenAI themselves; they
+read the snapshot refreshed in the background by services/readiness.py.
 """
 
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
 from fastapi import APIRouter
-from models.schemas import HealthResponse
+from fastapi.responses import JSONResponse
+from models.schemas import HealthResponse, ReadinessResponse
+from services.readiness import readiness
 from core.logging import setup_logger
 from config import get_settings
 
@@ -20,38 +28,34 @@ router   = APIRouter()
 settings = get_settings()
 
 
+@router.get("/health/live", tags=["System"])
+async def live():
+    """Liveness probe. If this answers, the event loop is alive."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready", response_model=ReadinessResponse, tags=["System"])
+async def ready():
+    """Readiness probe. Serves the last background snapshot; 503 when not ready."""
+    snapshot = readiness.snapshot
+    return JSONResponse(
+        content=ReadinessResponse(**snapshot).model_dump(),
+        status_code=200 if snapshot["ready"] else 503,
+    )
+
+
 @router.get("/health", response_model=HealthResponse, tags=["System"])
 async def health():
     """
     System health check.
-    Verifies ChromaDB is accessible and returns document count.
+    Reports vector store readiness and document count from the snapshot.
     """
-    try:
-        chroma_path = Path(settings.CHROMA_PATH)
-        sqlite_file = chroma_path / "chroma.sqlite3"
-
-        if not chroma_path.exists() or not sqlite_file.exists():
-            vector_store_ready = False
-            doc_count = 0
-        else:
-            client     = chromadb.PersistentClient(
-                path=str(chroma_path),
-                settings=ChromaSettings(anonymized_telemetry=False)
-            )
-            collection = client.get_or_create_collection(settings.COLLECTION_NAME)
-            doc_count  = collection.count()
-            vector_store_ready = doc_count > 0
-
-    except Exception as e:
-        logger.error(f"Health check error: {e}")
-        vector_store_ready = False
-        doc_count = 0
-
+    snapshot = readiness.snapshot
     return HealthResponse(
-        status="healthy" if vector_store_ready else "degraded",
+        status="healthy" if snapshot["ready"] else "degraded",
         app_name=settings.APP_NAME,
         version=settings.APP_VERSION,
-        vector_store_ready=vector_store_ready,
-        documents_indexed=doc_count,
+        vector_store_ready=snapshot["index_loaded"] and snapshot["chunk_count"] > 0,
+        documents_indexed=snapshot["chunk_count"],
         model=settings.CHAT_MODEL,
-    )
\ No newline at end of file
+    )
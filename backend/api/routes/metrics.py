@@ -0,0 +1,19 @@
+"""
+api/routes/metrics.py
+---------------------
+Prometheus scrape endpoint.
+
+Routes:
+    GET /metrics  -- Prometheus text exposition (see core/metrics.py)
+"""
+
+from fastapi import APIRouter, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+
+router = APIRouter()
+
+
+@router.get("/metrics", tags=["System"], include_in_schema=False)
+async def metrics():
+    """Node latency, Chroma/BM25 search time, OpenAI usage, retries, caches, sessions."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -13,6 +13,9 @@ class Settings(BaseSettings):
 
     CHAT_MODEL: str = "gpt-4o-mini"
     EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_CACHE_SIZE: int = 10_000       # In-process LRU entries for query vectors
+    EMBEDDING_DOC_CACHE_SIZE: int = 2_000    # Separate LRU for document/chunk vectors (0 = disk tier only)
+    EMBEDDING_CACHE_PATH: str = ""           # sqlite file for the disk tier; empty = memory only
 
     TEMPERATURE: float = 0.1
     MAX_TOKENS: int = 1024
@@ -21,17 +24,96 @@ class Settings(BaseSettings):
     CHROMA_PATH: str = str(PROJECT_ROOT / "chroma_db")
     DOCS_PATH: str = str(PROJECT_ROOT / "documents")
     HASH_REGISTRY_PATH: str = str(PROJECT_ROOT / "hash_registry.json")
+    LEXICAL_INDEX_PATH: str = str(PROJECT_ROOT / "chroma_db" / "bm25_index.json.gz")
+    INGEST_STAMP_PATH: str = str(PROJECT_ROOT / "chroma_db" / "last_ingest.txt")   # completion time of the last ingest
 
     COLLECTION_NAME: str = "telecom_support"
 
+    # Ingestion
+    INGEST_WORKERS: int = 4                  # Processes used to parse changed .docx files
+    EMBED_MAX_CONCURRENCY: int = 4           # Embedding requests in flight
+    EMBED_BATCH_MAX_TOKENS: int = 50_000     # Tokens per embedding request
+    EMBED_MAX_RETRIES: int = 5
+    EMBED_BACKOFF_BASE: float = 1.0          # Seconds; doubles per attempt
+    EMBED_BACKOFF_MAX: float = 30.0
+
     # Retrieval
     RETRIEVER_K: int = 5
     RETRIEVER_FETCH_K: int = 15
     RETRIEVER_LAMBDA: float = 0.7
+    RETRIEVER_MODE: str = "hybrid"           # "mmr" | "hybrid"
+    RETRIEVER_MIN_FILTERED: int = 3          # Below this, intent-filtered results are topped up unfiltered
+    HYBRID_VECTOR_WEIGHT: float = 1.0        # RRF weight of the MMR list
+    HYBRID_LEXICAL_WEIGHT: float = 1.0       # RRF weight of the BM25 list
+    HYBRID_RRF_K: int = 60
     RERANKER_TOP_N: int = 3
+    RERANKER_MODE: str = "listwise"          # "listwise" | "pointwise"
+    RERANKER_MAX_CONCURRENCY: int = 8        # Parallel calls in pointwise mode
+    RERANKER_BACKEND: str = "llm"            # "llm" | "cross_encoder"
+
+    # Local cross-encoder reranker (RERANKER_BACKEND=cross_encoder)
+    CROSS_ENCODER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L6-v2"
+    CROSS_ENCODER_ONNX_FILE: str = ""        # e.g. "onnx/model_qint8_avx512.onnx"
+    CROSS_ENCODER_WORKERS: int = 1           # Dedicated CPU inference threads
+    CROSS_ENCODER_MAX_BATCH: int = 64        # Max (query, chunk) pairs per forward pass
+    CROSS_ENCODER_BATCH_WAIT_MS: float = 2.0 # How long to wait for other requests to join
+
+    # Agent retry budget (per request)
+    AGENT_MAX_RETRIES: int = 2
+    AGENT_TOKEN_BUDGET: int = 8000           # Tokens across classify + rerank + generate calls
+    AGENT_LATENCY_BUDGET_MS: int = 15000     # No new retry once a request has run this long
+
+    # Intent classification
+    INTENT_CLASSIFIER: str = "centroid"      # "centroid" | "llm"
+    INTENT_CENTROID_MARGIN: float = 0.02     # Min top-two cosine gap to skip the LLM
+
+    # Semantic answer cache (history-free turns)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 1000
+    ANSWER_CACHE_THRESHOLD: float = 0.95     # Min cosine similarity to reuse an answer
+    COALESCE_WAIT_TIMEOUT_S: float = 60.0    # Max wait on an identical in-flight request before running it
 
     # Session  ✅ FIX
     MAX_HISTORY_TURNS: int = 10
+    SESSION_TTL_SECONDS: int = 1800          # Idle time before a session expires
+    SESSION_MAX_ENTRIES: int = 10000         # LRU eviction beyond this many sessions
+    SESSION_MAX_CHARS: int = 50_000_000      # ... or beyond this much stored text (~50 MB)
+    SESSION_SWEEP_INTERVAL_SECONDS: int = 60
+    MEMORY_MODE: str = "window"              # "window" (last N turns) | "summary" (rolling summary + recent turns)
+    MEMORY_RECENT_TURNS: int = 3             # Turns kept verbatim in summary mode
+    MEMORY_FOLD_TURNS: int = 2               # Older turns accumulated before a summarization pass
+    MEMORY_SUMMARY_MAX_TOKENS: int = 300
+
+    # Prompt assembly (generate_answer)
+    PROMPT_TOKEN_BUDGET: int = 3000          # Tokens for context chunks + history, excluding system prompt
+    CONTEXT_MIN_OVERLAP_CHARS: int = 40      # Min shared text to stitch two chunks of one file
+
+    # Admission control (services/admission.py)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENT: int = 32       # Agent runs in flight per worker
+    ADMISSION_MAX_QUEUE: int = 64            # Requests waiting for a slot; beyond this -> 503
+    ADMISSION_QUEUE_TIMEOUT_S: float = 5.0   # Max queue wait before shedding with 503
+
+    # Batch chat (POST /chat/batch)
+    BATCH_MAX_CONCURRENCY: int = 8           # Queries of one batch running at once
+    BATCH_OVERLOAD_RETRIES: int = 3          # Re-queue an item shed by admission control this many times
+
+    # Health probes (services/readiness.py)
+    HEALTH_REFRESH_INTERVAL_S: float = 15.0  # Background readiness refresh; probes read the snapshot
+    HEALTH_CHECK_UPSTREAM: bool = True       # Ping the OpenAI API on each refresh
+    HEALTH_UPSTREAM_TIMEOUT_S: float = 3.0
+    HEALTH_REQUIRE_UPSTREAM: bool = False    # Report not-ready while OpenAI is unreachable
+
+    # Rate limiting (api/middleware/rate_limit.py)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_IP_PER_MINUTE: int = 30
+    RATE_LIMIT_IP_BURST: int = 10
+    RATE_LIMIT_SESSION_PER_MINUTE: int = 10
+    RATE_LIMIT_SESSION_BURST: int = 5
+    RATE_LIMIT_BATCH_QUERIES_PER_MINUTE: int = 100  # /chat/batch: queries (not requests) per IP
+    RATE_LIMIT_BATCH_BURST: int = 500        # >= BatchChatRequest max size, so a full batch can pass
+    RATE_LIMIT_MAX_KEYS: int = 100_000       # LRU cap on tracked IPs / sessions (each)
+    RATE_LIMIT_IDLE_SECONDS: int = 600       # Forget keys idle this long (bucket is full again)
 
     # API
     API_HOST: str = "0.0.0.0"
@@ -40,6 +122,9 @@ class Settings(BaseSettings):
 
     # ✅ REQUIRED for logging
     DEBUG: bool = False
+    LOG_FORMAT: str = "text"                 # "text" | "json"
+    LOG_MAX_BYTES: int = 10_000_000          # Rotate rag_system.log at this size
+    LOG_BACKUP_COUNT: int = 5
 
     # CORS
     CORS_ORIGINS: list[str] = [
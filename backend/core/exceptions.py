@@ -54,4 +54,12 @@ class InvalidQueryError(NovaTelBaseException):
         )
 
     
-        
\ No newline at end of file
+        
+class ServiceOverloadedError(NovaTelBaseException):
+    """Raised when admission control sheds a request (queue full or queue deadline hit)."""
+    def __init__(self, reason: str, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(
+            message=f"Service is busy ({reason}). Please retry in {retry_after}s.",
+            status_code=503
+        )
@@ -1,6 +1,36 @@
-import logging
+"""
+core/logging.py
+---------------
+Process-wide logging configuration.
+
+WHY a queue:
+  Every module used to get its own console handler and its own
+  FileHandler on the same file, and every write happened synchronously
+  on the event-loop thread. Now the root logger has ONE QueueHandler;
+  a QueueListener thread does the formatting and the console/file I/O.
+  A log call on the request path only builds the record and enqueues it.
+
+Output:
+  LOG_FORMAT=text -> "time | LEVEL | logger | [request_id session_id] message"
+  LOG_FORMAT=json -> one JSON object per line (request_id/session_id fields)
+  The file is rotated by size (LOG_MAX_BYTES, LOG_BACKUP_COUNT).
+
+Request/session ids come from contextvars set by RequestContextMiddleware
+and chat_service, and are captured on the calling thread before enqueueing.
+
+Hot paths should log lazily:  logger.debug("Loaded %d messages", n)
+"""
+
 import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+
 from config import get_settings
 
 settings = get_settings()
@@ -8,29 +38,109 @@ settings = get_settings()
 BASE_DIR = Path(__file__).resolve().parent.parent
 LOG_FILE = BASE_DIR / "logs" / "rag_system.log"
 
-LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+session_id_var: ContextVar[str] = ContextVar("session_id", default="-")
 
 
-def setup_logger(name: str) -> logging.Logger:
-    logger = logging.getLogger(name)
+class ContextFilter(logging.Filter):
+    """Stamps request/session ids on the record while still on the caller's context."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "session_id": getattr(record, "session_id", "-"),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
 
-    if logger.handlers:
-        return logger
+class _LocalQueueHandler(QueueHandler):
+    """
+    In-process queue: the record object is handed over as-is, so message
+    interpolation and traceback formatting also happen on the listener
+    thread. (The stdlib version pre-formats for pickling.)
+    """
 
-    level = logging.DEBUG if settings.DEBUG else logging.INFO
-    logger.setLevel(level)
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
+
+# Chatty at INFO (one line per HTTP call); only surface their warnings
+QUIET_LOGGERS = ("httpx", "httpcore", "openai", "chromadb")
+
+_lock = threading.Lock()
+_listener: QueueListener = None
+
+
+def _formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(
+        "%(asctime)s | %(levelname)-8s | %(name)s | [%(request_id)s %(session_id)s] %(message)s"
     )
 
-    console = logging.StreamHandler(sys.stdout)
-    console.setFormatter(formatter)
 
-    file = logging.FileHandler(LOG_FILE, encoding="utf-8")
-    file.setFormatter(formatter)
+def configure_logging() -> None:
+    """Install the queue handler on the root logger and start the listener (idempotent)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        formatter = _formatter()
+
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(formatter)
+
+        file = RotatingFileHandler(
+            LOG_FILE, maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8",
+        )
+        file.setFormatter(formatter)
 
-    logger.addHandler(console)
-    logger.addHandler(file)
+        log_queue = queue.SimpleQueue()
+        handler = _LocalQueueHandler(log_queue)
+        handler.addFilter(ContextFilter())
 
-    return logger
\ No newline at end of file
+        root = logging.getLogger()
+        root.setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
+        root.addHandler(handler)
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+        _listener = QueueListener(log_queue, console, file, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        logging.getLogger().handlers = [
+            h for h in logging.getLogger().handlers if not isinstance(h, QueueHandler)
+        ]
+
+
+def setup_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(name)
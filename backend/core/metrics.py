@@ -0,0 +1,205 @@
+"""
+core/metrics.py
+---------------
+Prometheus instrumentation, served at GET /metrics.
+
+WHY these metrics:
+  processing_time_ms alone cannot tell a slow rerank from a slow OpenAI
+  call. Every graph node, Chroma query and OpenAI request is timed here.
+
+Cost:
+  Histogram/counter updates are a lock + a few float ops. Cache hit
+  rates and session counts are NOT updated on the hot path — they are
+  read from the owning component when /metrics is scraped.
+
+LLM accounting works through a LangChain callback handler, so it also
+works offline with stubbed/fake chat models.
+"""
+
+import time
+import functools
+from typing import Callable, Dict
+from uuid import UUID
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from langchain_core.callbacks import BaseCallbackHandler
+
+# ── Metric definitions ────────────────────────────────────────────────────────
+
+NODE_LATENCY = Histogram(
+    "novatel_graph_node_seconds",
+    "Latency of each LangGraph node",
+    ["node"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+SEARCH_LATENCY = Histogram(
+    "novatel_search_seconds",
+    "Latency of index searches (Chroma MMR / BM25), excluding query embedding",
+    ["index"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+OPENAI_REQUESTS = Counter(
+    "novatel_openai_requests_total",
+    "OpenAI requests by model, kind (chat/embedding) and status",
+    ["model", "kind", "status"],
+)
+
+OPENAI_LATENCY = Histogram(
+    "novatel_openai_request_seconds",
+    "OpenAI request latency by model and kind",
+    ["model", "kind"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+
+OPENAI_TOKENS = Counter(
+    "novatel_openai_tokens_total",
+    "Tokens reported by OpenAI, by model and type (prompt/completion)",
+    ["model", "type"],
+)
+
+COALESCED_REQUESTS = Counter(
+    "novatel_chat_coalesced_total",
+    "History-free chat requests served by joining an identical in-flight agent run",
+    ["mode"],
+)
+
+ADMISSION_WAIT = Histogram(
+    "novatel_admission_wait_seconds",
+    "Time admitted chat requests spent queued for an agent slot",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+
+ADMISSION_REJECTED = Counter(
+    "novatel_admission_rejected_total",
+    "Chat requests shed with 503, by reason (queue_full/deadline)",
+    ["reason"],
+)
+
+AGENT_RETRIES = Counter(
+    "novatel_agent_retry_decisions_total",
+    "Low-confidence retry decisions: retry, or why retrying stopped",
+    ["outcome"],
+)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def timed_node(name: str):
+    """Decorator recording the latency of an async graph node."""
+    def decorator(fn):
+        histogram = NODE_LATENCY.labels(name)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def observe_openai(model: str, kind: str, seconds: float, status: str = "ok") -> None:
+    OPENAI_REQUESTS.labels(model, kind, status).inc()
+    OPENAI_LATENCY.labels(model, kind).observe(seconds)
+
+
+def token_usage(response) -> int:
+    """Total tokens reported by the provider for one LLM response (0 if unknown)."""
+    return (getattr(response, "usage_metadata", None) or {}).get("total_tokens", 0)
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    Counts chat-model calls, latency and token usage per model.
+    Attach with ChatOpenAI(..., callbacks=[llm_metrics]).
+    """
+
+    # Sync handlers on async runs are otherwise dispatched to the default
+    # thread pool; this one only touches counters, so run it on the loop.
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[UUID, tuple] = {}
+
+    @staticmethod
+    def _model_name(serialized: dict, metadata: dict) -> str:
+        kwargs = (serialized or {}).get("kwargs", {})
+        return (
+            (metadata or {}).get("ls_model_name")
+            or kwargs.get("model_name")
+            or kwargs.get("model")
+            or "unknown"
+        )
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._runs[run_id] = (self._model_name(serialized, metadata), time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._runs[run_id] = (self._model_name(serialized, metadata), time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, start = self._runs.pop(run_id, ("unknown", None))
+        if start is not None:
+            observe_openai(model, "chat", time.perf_counter() - start)
+
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        if prompt is None:
+            # Streaming / non-OpenAI models report usage on the message instead
+            message = getattr(response.generations[0][0], "message", None) if response.generations else None
+            meta = getattr(message, "usage_metadata", None) or {}
+            prompt, completion = meta.get("input_tokens", 0), meta.get("output_tokens", 0)
+
+        if prompt:
+            OPENAI_TOKENS.labels(model, "prompt").inc(prompt)
+        if completion:
+            OPENAI_TOKENS.labels(model, "completion").inc(completion)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        model, start = self._runs.pop(run_id, ("unknown", None))
+        if start is not None:
+            observe_openai(model, "chat", time.perf_counter() - start, status="error")
+
+
+llm_metrics = LLMMetricsCallback()
+
+
+# ── Scrape-time stats (caches, sessions) ──────────────────────────────────────
+
+class StatsCollector:
+    """
+    Exposes numeric values of registered stats() callables as gauges,
+    e.g. register_stats_source("answer_cache", answer_cache.stats)
+    -> novatel_answer_cache_hit_rate, novatel_answer_cache_hits, ...
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], dict]] = {}
+
+    def register(self, prefix: str, fn: Callable[[], dict]) -> None:
+        self._sources[prefix] = fn
+
+    def collect(self):
+        for prefix, fn in self._sources.items():
+            try:
+                stats = fn()
+            except Exception:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauge = GaugeMetricFamily(f"novatel_{prefix}_{key}", f"{prefix} {key}")
+                    gauge.add_metric([], float(value))
+                    yield gauge
+
+
+_stats_collector = StatsCollector()
+REGISTRY.register(_stats_collector)
+
+
+def register_stats_source(prefix: str, fn: Callable[[], dict]) -> None:
+    _stats_collector.register(prefix, fn)
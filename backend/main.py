@@ -12,9 +12,11 @@ API docs:
 """
 
 import sys
+import asyncio
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -23,11 +25,49 @@ load_dotenv(Path(__file__).resolve().parents[1] / ".env")
 
 from config import get_settings
 from core.logging import setup_logger
-from api.routes import chat, health, admin
+from api.routes import chat, health, admin, metrics
+from api.middleware.rate_limit import RateLimitMiddleware
+from api.middleware.request_context import RequestContextMiddleware
+from rag.store import get_store
+from rag.embeddings import get_embedding_model
+from agent.nodes import intent_classifier
+from services.answer_cache import answer_cache
+from services.admission import chat_admission
+from services.readiness import readiness
+from services.session_service import get_session_store, run_session_sweeper
+from core.metrics import register_stats_source
 
 settings = get_settings()
 logger = setup_logger(__name__)
 
+# ── Startup / Shutdown ────────────────────────────────────────
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
+    logger.info(f"Chat model    : {settings.CHAT_MODEL}")
+    logger.info(f"Embedding     : {settings.EMBEDDING_MODEL}")
+    logger.info(f"API docs      : http://localhost:{settings.API_PORT}/docs")
+
+    # One Chroma client for the whole process — retriever, health,
+    # admin and re-ingestion all share it. The first readiness refresh
+    # opens it, so /health/ready is accurate from the first probe.
+    store = get_store()
+    if not store.is_ready():
+        logger.warning("Vector store not found — run ingestion first")
+    await readiness.refresh()
+    # Built here (and after each ingest), never on a live request
+    await asyncio.to_thread(intent_classifier.refresh)
+
+    sweeper = asyncio.create_task(run_session_sweeper())
+    prober  = asyncio.create_task(readiness.run())
+
+    yield
+
+    logger.info("Shutting down NovaTel AI Support Agent")
+    sweeper.cancel()
+    prober.cancel()
+    store.close()
+
 # ── Create App ────────────────────────────────────────────────
 app = FastAPI(
     title=settings.APP_NAME,
@@ -35,9 +75,12 @@ app = FastAPI(
     version=settings.APP_VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
-# ── CORS Middleware (only this — no custom middleware for now) ─
+# ── Middleware (last added runs first: CORS wraps the limiter, ─
+#    so 429 responses still carry CORS headers) ─────────────────
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -45,23 +88,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestContextMiddleware)   # outermost: every log line gets a request id
 
 # ── Routers ───────────────────────────────────────────────────
 app.include_router(chat.router)
 app.include_router(health.router)
 app.include_router(admin.router)
+app.include_router(metrics.router)
 
-# ── Startup / Shutdown ────────────────────────────────────────
-@app.on_event("startup")
-async def startup():
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-    logger.info(f"Chat model    : {settings.CHAT_MODEL}")
-    logger.info(f"Embedding     : {settings.EMBEDDING_MODEL}")
-    logger.info(f"API docs      : http://localhost:{settings.API_PORT}/docs")
-
-@app.on_event("shutdown")
-async def shutdown():
-    logger.info("Shutting down NovaTel AI Support Agent")
+# ── Scrape-time metrics (read on /metrics, nothing on the hot path) ─
+register_stats_source("embedding_cache", lambda: get_embedding_model().stats())
+register_stats_source("answer_cache", answer_cache.stats)
+register_stats_source("sessions", lambda: get_session_store().stats())
+register_stats_source("admission", chat_admission.stats)
 
 # ── Dev entry point ───────────────────────────────────────────
 if __name__ == "__main__":
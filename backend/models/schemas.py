@@ -74,6 +74,21 @@ class ChatRequest(BaseModel):
             raise ValueError("Message cannot be blank or whitespace only.")
         return v.strip()
     
+class BatchChatRequest(BaseModel):
+    """
+    Bulk/offline query replay (POST /chat/batch).
+
+    Items run concurrently, so items sharing a session_id see that
+    session's history in no particular order - use distinct session ids
+    for independent evaluation runs.
+    """
+    queries: List[ChatRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="Queries to run through the agent"
+    )
+
 # ── Response Schemas ──────────────────────────────────────────────────────────
 
 class ChatResponse(BaseModel):
@@ -87,6 +102,15 @@ class ChatResponse(BaseModel):
     needs_escalation: bool = False
     confidence: float = Field(default=0.0, ge=0.0, le=1.0)
     processing_time_ms: int = Field(default=0, ge=0)
+    retry_count: int = Field(default=0, ge=0)
+    retry_reason: Optional[str] = None
+
+class BatchChatResult(BaseModel):
+    """One NDJSON line of POST /chat/batch, emitted as each query finishes."""
+    index: int = Field(..., description="Position of the query in the request")
+    session_id: str
+    response: Optional[ChatResponse] = None
+    error: Optional[str] = None
 
 class HealthResponse(BaseModel):
     """Response from GET /health endpoint."""
@@ -97,6 +121,15 @@ class HealthResponse(BaseModel):
     documents_indexed: int
     model: str
 
+class ReadinessResponse(BaseModel):
+    """Response from GET /health/ready (background-refreshed snapshot)."""
+    ready: bool
+    index_loaded: bool
+    chunk_count: int
+    last_ingested_at: Optional[str] = None
+    upstream_ok: Optional[bool] = None
+    checked_at: Optional[str] = None
+
 class SessionClearResponse(BaseModel):
     """Response from DELETE /session/{id} endpoint."""
     session_id: str
@@ -109,4 +142,6 @@ class AdminStatsResponse(BaseModel):
     embedding_model: str
     chat_model: str
     active_sessions: int
+    answer_cache: dict = Field(default_factory=dict)
+    embedding_cache: dict = Field(default_factory=dict)
     
\ No newline at end of file
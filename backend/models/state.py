@@ -27,6 +27,9 @@ class AgentState(TypedDict):
           Full conversation history as LangChain message objects.
           Annotated with operator.add so each node APPENDS to the list
           instead of replacing it. This is LangGraph's merge strategy.
+    summary:
+          Running summary of turns folded out of `messages`
+          (MEMORY_MODE=summary), or None.
     session_id:
           Ties this invocation to a user session for memory persistence.
     
@@ -34,7 +37,7 @@ class AgentState(TypedDict):
           The raw query from the current turn.
     intent:
           Classified intent - set by classify_intent node.
-          Used to enrich the retrieval query for better precision.
+          Used as a category metadata filter for retrieval.
     retrieved_docs:
           Raw chunks from MMR retrieval - set by retrieve_documents node.
     
@@ -51,10 +54,23 @@ class AgentState(TypedDict):
         True if user asked for a human agent or used complaint keywords.
 
     iteration_count:
-        Tracked retries. Max 1 retry to avoid infinite loop.
+        Retrieval passes so far. Each retry widens k/fetch_k.
+
+    seen_ids:
+        Chunk ids retrieved in earlier passes - skipped on retry.
+
+    scored_docs:
+        Every chunk scored so far (with rerank_score) - reused on retry.
+
+    tokens_used / started_at:
+        Per-request budget accounting (AGENT_TOKEN_BUDGET, AGENT_LATENCY_BUDGET_MS).
+
+    retry_pending / retry_count / retry_reason:
+        Retry decision made by generate_answer and reported in the response.
     """
 
     messages: Annotated[List[BaseMessage], operator.add]
+    summary: Optional[str]
     session_id: str
     user_query: str
     intent: Optional[str]
@@ -63,4 +79,11 @@ class AgentState(TypedDict):
     answer: Optional[str]
     sources: List[dict]
     needs_escalation: bool
-    iteration_count: int
\ No newline at end of file
+    iteration_count: int
+    seen_ids: List[str]
+    scored_docs: List[dict]
+    tokens_used: int
+    started_at: float
+    retry_pending: bool
+    retry_count: int
+    retry_reason: Optional[str]
\ No newline at end of file
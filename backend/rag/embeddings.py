@@ -7,39 +7,317 @@ WHY this file exists:
   Single source of truth for the embedding model.
   Every module imports get_embedding_model() from here.
   Change the model in ONE place — entire system updates.
+
+Caching:
+  Support traffic is dominated by near-identical questions, so the model is
+  wrapped in CachedEmbeddings - a drop-in LangChain Embeddings with two tiers:
+    1. In-process float32 LRUs keyed by (model, kind, text) - separate for
+       queries (normalized text) and documents (exact text)
+    2. Optional on-disk sqlite tier (EMBEDDING_CACHE_PATH) that survives restarts;
+       the async methods run its reads/writes in a worker thread
 """
 
 import sys
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
+from typing import List, Optional
 
 # Path bootstrap — allows direct execution and imports
 BACKEND_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(BACKEND_DIR))
 
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 from config import get_settings
 from core.logging import setup_logger
+from core.metrics import observe_openai
 
 logger = setup_logger(__name__)
 settings = get_settings()
 
 
-def get_embedding_model() -> OpenAIEmbeddings:
+def normalize_text(text: str) -> str:
+    """Cache-key normalization: collapse whitespace and ignore case."""
+    return " ".join(text.split()).casefold()
+
+
+class SqliteEmbeddingStore:
+    """
+    Persistent embedding tier. One row per (model, text) key,
+    vectors stored as packed float32 blobs.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commits no longer fsync; a crash can lose only the
+        # newest cache rows, which are re-fetched from the API
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> dict:
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", keys
+            ).fetchall()
+        return {key: array("f", blob) for key, blob in rows}
+
+    def put_many(self, items: dict) -> None:
+        if not items:
+            return
+        rows = [(key, array("f", vec).tobytes()) for key, vec in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Drop-in Embeddings wrapper that caches vectors for repeated texts.
+
+    Lookup order: memory LRU -> sqlite (if configured) -> upstream model.
+    Only cache misses are sent upstream, in a single batched call.
+    `hits` counts texts served from either tier; `disk_hits` is the sqlite share.
+
+    Queries and documents are cached separately:
+      - query keys are normalized (whitespace/case), document keys are the
+        exact text - two chunks differing only in case are different chunks
+      - each kind has its own LRU, so a re-ingest filling the document LRU
+        never evicts hot query vectors
+    Vectors are held in memory as float32 arrays (~6 KB per 1536 dims,
+    vs ~48 KB as a list of Python floats) and converted to lists on read.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        max_entries: int = 10_000,
+        max_document_entries: int = 2_000,
+        store: Optional[SqliteEmbeddingStore] = None,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.store = store
+        self._memory = {
+            "query": (OrderedDict(), max_entries),
+            "document": (OrderedDict(), max_document_entries),
+        }
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str, kind: str) -> str:
+        text = normalize_text(text) if kind == "query" else text
+        raw = f"{self.model_name}\x00{kind}\x00{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, kind: str, key: str, vector) -> None:
+        memory, limit = self._memory[kind]
+        if limit <= 0:
+            return
+        memory[key] = vector if isinstance(vector, array) else array("f", vector)
+        memory.move_to_end(key)
+        while len(memory) > limit:
+            memory.popitem(last=False)
+
+    def _memory_lookup(self, texts: List[str], kind: str) -> tuple:
+        """Memory tier only. Returns (keys, found, pending_keys)."""
+        keys = [self._key(t, kind) for t in texts]
+        found: dict = {}
+        memory, _ = self._memory[kind]
+
+        with self._lock:
+            for key in keys:
+                if key in memory:
+                    memory.move_to_end(key)
+                    found[key] = memory[key]
+
+        pending = [k for k in dict.fromkeys(keys) if k not in found]
+        return keys, found, pending
+
+    def _disk_lookup(self, kind: str, pending: List[str]) -> dict:
+        """sqlite tier. Blocking - the async paths run it in a worker thread."""
+        from_disk = self.store.get_many(pending)
+        with self._lock:
+            for key, vector in from_disk.items():
+                self._remember(kind, key, vector)
+            self.disk_hits += len(from_disk)
+        return from_disk
+
+    def _missing(self, texts: List[str], keys: List[str], found: dict) -> List[int]:
+        missing, seen = [], set()
+        for i, key in enumerate(keys):
+            if key not in found and key not in seen:
+                missing.append(i)
+                seen.add(key)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return missing
+
+    def _lookup(self, texts: List[str], kind: str) -> tuple:
+        """Resolve what we can from cache. Returns (keys, found, missing_indices)."""
+        keys, found, pending = self._memory_lookup(texts, kind)
+        if pending and self.store is not None:
+            found.update(self._disk_lookup(kind, pending))
+        return keys, found, self._missing(texts, keys, found)
+
+    async def _alookup(self, texts: List[str], kind: str) -> tuple:
+        """_lookup() that keeps sqlite I/O off the event loop."""
+        keys, found, pending = self._memory_lookup(texts, kind)
+        if pending and self.store is not None:
+            found.update(await asyncio.to_thread(self._disk_lookup, kind, pending))
+        return keys, found, self._missing(texts, keys, found)
+
+    def _remember_fresh(self, kind: str, keys: List[str], missing: List[int], vectors: list,
+                        found: dict) -> dict:
+        fresh = {keys[i]: array("f", vec) for i, vec in zip(missing, vectors)}
+        with self._lock:
+            for key, vec in fresh.items():
+                self._remember(kind, key, vec)
+        found.update(fresh)
+        return fresh
+
+    def _store(self, kind: str, keys: List[str], missing: List[int], vectors: list,
+               found: dict) -> List[List[float]]:
+        fresh = self._remember_fresh(kind, keys, missing, vectors, found)
+        if self.store is not None:
+            self.store.put_many(fresh)
+        return [found[k].tolist() for k in keys]
+
+    async def _astore(self, kind: str, keys: List[str], missing: List[int], vectors: list,
+                      found: dict) -> List[List[float]]:
+        fresh = self._remember_fresh(kind, keys, missing, vectors, found)
+        if self.store is not None and fresh:
+            await asyncio.to_thread(self.store.put_many, fresh)
+        return [found[k].tolist() for k in keys]
+
+    @contextmanager
+    def _upstream(self):
+        """Record latency/status of one upstream embedding request."""
+        start, status = time.perf_counter(), "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            observe_openai(self.model_name, "embedding", time.perf_counter() - start, status)
+
+    # ── Embeddings interface ──────────────────────────────────────────────────
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts, "document")
+        vectors = []
+        if missing:
+            with self._upstream():
+                vectors = self.underlying.embed_documents([texts[i] for i in missing])
+        return self._store("document", keys, missing, vectors, found)
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._lookup([text], "query")
+        vectors = []
+        if missing:
+            with self._upstream():
+                vectors = [self.underlying.embed_query(text)]
+        return self._store("query", keys, missing, vectors, found)[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await self._alookup(texts, "document")
+        vectors = []
+        if missing:
+            with self._upstream():
+                vectors = await self.underlying.aembed_documents([texts[i] for i in missing])
+        return await self._astore("document", keys, missing, vectors, found)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = await self._alookup([text], "query")
+        vectors = []
+        if missing:
+            with self._upstream():
+                vectors = [await self.underlying.aembed_query(text)]
+        return (await self._astore("query", keys, missing, vectors, found))[0]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Many queries in ONE upstream call, cached as queries (so later
+        aembed_query calls for the same texts hit). Used by /chat/batch.
+        """
+        keys, found, missing = await self._alookup(texts, "query")
+        vectors = []
+        if missing:
+            with self._upstream():
+                vectors = await self.underlying.aembed_documents([texts[i] for i in missing])
+        return await self._astore("query", keys, missing, vectors, found)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory["query"][0]),
+            "document_memory_entries": len(self._memory["document"][0]),
+        }
+
+
+@lru_cache
+def get_embedding_model() -> CachedEmbeddings:
     """
-    Returns a configured OpenAI embedding model instance.
+    Returns the process-wide cached embedding model.
 
     Model: text-embedding-3-small
       - 1536 dimensions
       - Best cost/performance ratio for RAG
       - $0.02 per million tokens
 
+    The instance is shared so retriever and ingestor use the same cache.
+
     Usage:
         from rag.embeddings import get_embedding_model
         embeddings = get_embedding_model()
     """
     logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL}")
 
-    return OpenAIEmbeddings(
+    base = OpenAIEmbeddings(
         model=settings.EMBEDDING_MODEL,
         openai_api_key=settings.OPENAI_API_KEY,
-    )
\ No newline at end of file
+    )
+    store = (
+        SqliteEmbeddingStore(settings.EMBEDDING_CACHE_PATH)
+        if settings.EMBEDDING_CACHE_PATH else None
+    )
+    return CachedEmbeddings(
+        underlying=base,
+        model_name=settings.EMBEDDING_MODEL,
+        max_entries=settings.EMBEDDING_CACHE_SIZE,
+        max_document_entries=settings.EMBEDDING_DOC_CACHE_SIZE,
+        store=store,
+    )
@@ -5,7 +5,12 @@ rag/ingestor.py - Compatible with ChromaDB 0.5.18
 import os
 import sys
 import json
+import time
+import random
 import hashlib
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List
 
@@ -16,14 +21,17 @@ sys.path.insert(0, str(BACKEND_DIR))
 from dotenv import load_dotenv
 load_dotenv(PROJECT_ROOT / ".env")
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+import openai
+import tiktoken
 from langchain_community.document_loaders import UnstructuredWordDocumentLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
+from rag.embeddings import get_embedding_model
+from rag.store import get_store, chunk_id
+from rag.lexical import build_lexical_index
 from config import get_settings
 from core.logging import setup_logger
+from core.exceptions import DocumentIngestionError
 
 logger   = setup_logger(__name__)
 settings = get_settings()
@@ -34,7 +42,15 @@ HASH_REGISTRY   = Path(settings.HASH_REGISTRY_PATH)
 COLLECTION_NAME = settings.COLLECTION_NAME
 CHUNK_SIZE      = 1000
 CHUNK_OVERLAP   = 200
-BATCH_SIZE      = 100
+MAX_BATCH_ITEMS = 2048   # OpenAI limit on inputs per embeddings request
+
+# Transient upstream errors worth retrying with backoff
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
 
 
 def compute_hash(text: str) -> str:
@@ -81,26 +97,117 @@ def validate_environment() -> None:
     logger.info(f"Valid | Docs: {len(list(DOCS_PATH.glob('*.docx')))} | Chroma: {CHROMA_PATH}")
 
 
-def load_documents() -> List[Document]:
+def compute_bytes_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_docx(path: str) -> List[Document]:
+    """Parse one .docx file. Module-level so it can run in a worker process."""
+    return UnstructuredWordDocumentLoader(path).load()
+
+
+def is_unchanged(entry, stat: os.stat_result) -> bool:
+    """Fast check — same size and mtime as last run means no need to even read the file."""
+    return (
+        isinstance(entry, dict)
+        and entry.get("size") == stat.st_size
+        and entry.get("mtime") == stat.st_mtime_ns
+    )
+
+
+def parse_changed_files(paths: List[Path]) -> dict:
+    """
+    Parse files in a process pool (INGEST_WORKERS). Unstructured parsing is
+    CPU-bound, so processes beat threads here. Returns {filename: docs};
+    files that fail to parse are logged and left out.
+    """
+    parsed: dict = {}
+    workers = min(settings.INGEST_WORKERS, len(paths))
+
+    if workers <= 1:
+        for path in paths:
+            try:
+                parsed[path.name] = parse_docx(str(path))
+            except Exception as e:
+                logger.error(f"Failed: {path.name}: {e}")
+        return parsed
+
+    # spawn, not fork: the server process has live threads (log listener,
+    # Chroma, executors) and forking them can deadlock the children
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(parse_docx, str(path)): path.name for path in paths}
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                parsed[filename] = future.result()
+            except Exception as e:
+                logger.error(f"Failed: {filename}: {e}")
+    return parsed
+
+
+def load_documents() -> tuple:
+    """
+    Load only new or changed documents.
+
+    Change detection, cheapest first:
+      1. size + mtime match the registry  -> skip without reading
+      2. raw bytes hash matches           -> skip without parsing (file was touched)
+      3. parse, then compare text hash    -> skip if content is identical
+
+    Registry entry per file: {content_hash, raw_hash, size, mtime}.
+    Returns (documents, new_registry). The caller saves the registry only
+    after the vector store is updated, so a failed run is retried next time.
+    """
     old_registry = load_hash_registry()
     new_registry = {}
     all_docs: List[Document] = []
+    to_parse: dict = {}
 
     for docx_path in sorted(DOCS_PATH.glob("*.docx")):
         filename = docx_path.name
-        try:
-            loader   = UnstructuredWordDocumentLoader(str(docx_path))
-            raw_docs = loader.load()
-        except Exception as e:
-            logger.error(f"Failed: {filename}: {e}"); continue
+        stat     = docx_path.stat()
+        entry    = old_registry.get(filename)
+
+        if is_unchanged(entry, stat):
+            new_registry[filename] = entry
+            logger.info(f"Unchanged — skipping: {filename}"); continue
+
+        raw_hash = compute_bytes_hash(docx_path)
+        file_meta = {"raw_hash": raw_hash, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+        if isinstance(entry, dict) and entry.get("raw_hash") == raw_hash:
+            new_registry[filename] = {**entry, **file_meta}
+            logger.info(f"Unchanged (touched) — skipping: {filename}"); continue
+
+        to_parse[filename] = (docx_path, file_meta)
+
+    if to_parse:
+        logger.info(f"Parsing {len(to_parse)} changed file(s) | workers={settings.INGEST_WORKERS}")
+    parsed = parse_changed_files([path for path, _ in to_parse.values()])
+
+    for filename, (_, file_meta) in to_parse.items():
+        if filename not in parsed:
+            # Parse failed — keep the previous entry so the file is retried next run
+            if filename in old_registry:
+                new_registry[filename] = old_registry[filename]
+            continue
 
+        raw_docs = parsed[filename]
         if not raw_docs:
             continue
 
         file_hash = compute_file_hash(raw_docs)
-        new_registry[filename] = file_hash
+        new_registry[filename] = {"content_hash": file_hash, **file_meta}
 
-        if old_registry.get(filename) == file_hash:
+        # Legacy registries stored the content hash as a plain string
+        entry = old_registry.get(filename)
+        old_hash = entry.get("content_hash") if isinstance(entry, dict) else entry
+        if old_hash == file_hash:
             logger.info(f"Unchanged — skipping: {filename}"); continue
 
         category = infer_category(filename)
@@ -111,9 +218,8 @@ def load_documents() -> List[Document]:
         all_docs.extend(raw_docs)
         logger.info(f"Loaded: {filename} [{category}]")
 
-    save_hash_registry(new_registry)
     logger.info(f"Loading complete | {len(all_docs)} pages")
-    return all_docs
+    return all_docs, new_registry
 
 
 def split_documents(documents: List[Document]) -> List[Document]:
@@ -128,85 +234,253 @@ def split_documents(documents: List[Document]) -> List[Document]:
     return chunks
 
 
-def build_vector_store(chunks: List[Document]) -> None:
-    logger.info(f"Creating ChromaDB at: {CHROMA_PATH}")
-    CHROMA_PATH.mkdir(parents=True, exist_ok=True)
+def diff_chunks(collection, chunks: List[Document]) -> tuple:
+    """
+    Compare freshly split chunks with what the collection already holds.
 
-    client = chromadb.PersistentClient(
-        path=str(CHROMA_PATH),
-        settings=ChromaSettings(anonymized_telemetry=False)
-    )
+    Chunk ids hash (source_file, content) - see rag.store.chunk_id - so the
+    same text in two files gives two ids, and for every changed source_file:
+      - ids present in both      -> reuse stored embedding (no API call)
+      - ids only in new chunks   -> embed
+      - ids only in collection   -> stale, delete
 
-    collection = client.get_or_create_collection(
-        name=COLLECTION_NAME,
-        metadata={"hnsw:space": "cosine"}
-    )
+    Returns (chunks_to_embed, stale_ids, reused_count).
+    """
+    by_file: dict = {}
+    for chunk in chunks:
+        filename = chunk.metadata["source_file"]
+        by_file.setdefault(filename, {})[chunk_id(filename, chunk.page_content)] = chunk
 
-    embeddings_model = OpenAIEmbeddings(
-        model=settings.EMBEDDING_MODEL,
-        openai_api_key=settings.OPENAI_API_KEY,
-    )
+    to_embed: List[Document] = []
+    stale_ids: List[str] = []
+    reused = 0
+
+    for filename, wanted in by_file.items():
+        existing = set(collection.get(where={"source_file": filename}, include=[])["ids"])
+        fresh    = [c for cid, c in wanted.items() if cid not in existing]
+        stale    = existing - wanted.keys()
 
-    total_batches = (len(chunks) + BATCH_SIZE - 1) // BATCH_SIZE
+        to_embed.extend(fresh)
+        stale_ids.extend(stale)
+        reused += len(wanted) - len(fresh)
+        logger.info(
+            f"Diff {filename}: {len(fresh)} new | "
+            f"{len(wanted) - len(fresh)} reused | {len(stale)} stale"
+        )
 
-    for batch_num, start in enumerate(range(0, len(chunks), BATCH_SIZE), 1):
-        batch   = chunks[start: start + BATCH_SIZE]
-        texts   = [c.page_content for c in batch]
-        metas   = [c.metadata for c in batch]
-        ids     = [compute_hash(t) for t in texts]
+    return to_embed, stale_ids, reused
 
-        logger.info(f"Embedding batch {batch_num}/{total_batches} ({len(batch)} chunks)...")
 
+def get_encoding():
+    try:
+        return tiktoken.encoding_for_model(settings.EMBEDDING_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def token_batches(chunks: List[Document]) -> List[List[Document]]:
+    """
+    Group chunks into embedding requests by token count rather than a
+    fixed chunk count, so every request is close to EMBED_BATCH_MAX_TOKENS.
+    """
+    encoding = get_encoding()
+    batches: List[List[Document]] = []
+    current: List[Document] = []
+    current_tokens = 0
+
+    for chunk in chunks:
+        tokens = len(encoding.encode(chunk.page_content, disallowed_special=()))
+        if current and (
+            current_tokens + tokens > settings.EMBED_BATCH_MAX_TOKENS
+            or len(current) >= MAX_BATCH_ITEMS
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(chunk)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def embed_with_backoff(embeddings_model, texts: List[str], batch_num: int) -> List[List[float]]:
+    """Embed one batch, retrying rate-limit/transient errors with exponential backoff + jitter."""
+    for attempt in range(settings.EMBED_MAX_RETRIES + 1):
         try:
-            vectors = embeddings_model.embed_documents(texts)
-            collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metas)
-            logger.info(f"Batch {batch_num} saved ✓")
-        except Exception as e:
-            logger.error(f"Batch {batch_num} failed: {e}", exc_info=True)
+            return embeddings_model.embed_documents(texts)
+        except RETRYABLE_ERRORS as e:
+            if attempt == settings.EMBED_MAX_RETRIES:
+                raise
+            delay = min(settings.EMBED_BACKOFF_BASE * (2 ** attempt), settings.EMBED_BACKOFF_MAX)
+            delay *= random.uniform(0.5, 1.0)
+            logger.warning(
+                f"Batch {batch_num} attempt {attempt + 1} failed ({type(e).__name__}) — "
+                f"retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+
+def get_collection():
+    """Shared collection from rag/store.py — same client the API uses."""
+    return get_store().collection()
+
+
+def _indexed_files(collection) -> set:
+    """Every source_file present in the collection (full metadata scan)."""
+    indexed_files: set = set()
+    offset, page = 0, 5000
+    while True:
+        metas = collection.get(include=["metadatas"], limit=page, offset=offset)["metadatas"]
+        indexed_files.update(m["source_file"] for m in metas if m and "source_file" in m)
+        if len(metas) < page:
             break
+        offset += page
+    return indexed_files
+
+
+def reconcile_collection(collection, old_registry: dict, registry: dict) -> int:
+    """
+    Delete vectors whose source_file is no longer tracked in the registry
+    (file removed from documents/, or changed to empty content).
+    Returns the number of vectors removed.
+
+    The removed files are simply old_registry - registry. The collection is
+    only scanned when there is no trustworthy old registry (first run, or a
+    legacy registry of plain content-hash strings).
+    """
+    legacy = not old_registry or any(not isinstance(e, dict) for e in old_registry.values())
+    if legacy:
+        gone = _indexed_files(collection) - registry.keys()
+    else:
+        gone = old_registry.keys() - registry.keys()
+
+    removed = 0
+    for filename in sorted(gone):
+        ids = collection.get(where={"source_file": filename}, include=[])["ids"]
+        if ids:
+            collection.delete(ids=ids)
+            removed += len(ids)
+            logger.info(f"Removed {len(ids)} vectors for deleted document: {filename}")
+    return removed
+
+
+def build_vector_store(chunks: List[Document]) -> dict:
+    """
+    Embed and store new chunks.
+
+    Embedding requests run concurrently (EMBED_MAX_CONCURRENCY in flight);
+    each finished batch is upserted immediately on this thread, so Chroma
+    writes overlap with the embedding calls still in flight. Any batch that
+    still fails after retries aborts the run with DocumentIngestionError.
+    """
+    collection       = get_collection()
+    embeddings_model = get_embedding_model()
+
+    to_embed, stale_ids, reused = diff_chunks(collection, chunks)
+    batches       = token_batches(to_embed)
+    total_batches = len(batches)
+    failures      = []
+
+    with ThreadPoolExecutor(max_workers=settings.EMBED_MAX_CONCURRENCY) as pool:
+        futures = {
+            pool.submit(embed_with_backoff, embeddings_model, [c.page_content for c in batch], num): (num, batch)
+            for num, batch in enumerate(batches, 1)
+        }
+        logger.info(
+            f"Embedding {len(to_embed)} chunks in {total_batches} batches | "
+            f"concurrency={settings.EMBED_MAX_CONCURRENCY}"
+        )
+
+        for future in as_completed(futures):
+            batch_num, batch = futures[future]
+            texts = [c.page_content for c in batch]
+            try:
+                vectors = future.result()
+                collection.upsert(
+                    ids=[chunk_id(c.metadata["source_file"], c.page_content) for c in batch],
+                    embeddings=vectors,
+                    documents=texts,
+                    metadatas=[c.metadata for c in batch],
+                )
+                logger.info(f"Batch {batch_num}/{total_batches} saved ✓ ({len(batch)} chunks)")
+            except Exception as e:
+                logger.error(f"Batch {batch_num} failed: {e}", exc_info=True)
+                failures.append((batch, e))
+
+    if failures:
+        files = sorted({c.metadata["source_file"] for batch, _ in failures for c in batch})
+        raise DocumentIngestionError(
+            ", ".join(files),
+            f"{len(failures)}/{total_batches} embedding batches failed: {failures[0][1]}",
+        )
+
+    # Stale chunks are removed only once their replacements are stored
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+        logger.info(f"Deleted {len(stale_ids)} stale chunks")
 
     logger.info(f"Total in collection: {collection.count()}")
+    return {"embedded": len(to_embed), "reused": reused, "deleted": len(stale_ids)}
+
 
+def ingest() -> dict:
+    """
+    Run the incremental ingestion pipeline.
 
-def ingest() -> None:
+    Returns a summary dict: chunks, embedded, reused, removed, total.
+    `removed` counts superseded chunks of changed files plus every vector
+    of documents that are no longer in documents/.
+    """
     logger.info("=" * 60)
     logger.info("  NovaTel RAG — Document Ingestion Pipeline")
     logger.info("=" * 60)
 
     validate_environment()
-    documents = load_documents()
-
-    if not documents:
-        logger.info("No changes — skipping ingestion")
-        try:
-            client = chromadb.PersistentClient(path=str(CHROMA_PATH))
-            col    = client.get_collection(COLLECTION_NAME)
-            logger.info(f"Existing chunks: {col.count()}")
-        except Exception:
-            logger.info("No existing store found")
-        return
-
+    old_registry = load_hash_registry()
+    documents, registry = load_documents()
     chunks = split_documents(documents)
-    if not chunks:
-        logger.warning("0 chunks — check document content")
-        return
 
-    build_vector_store(chunks)
-
-    try:
-        client = chromadb.PersistentClient(path=str(CHROMA_PATH))
-        col    = client.get_collection(COLLECTION_NAME)
-        total  = col.count()
-    except Exception:
-        total = len(chunks)
+    result = {"embedded": 0, "reused": 0, "deleted": 0}
+    if chunks:
+        result = build_vector_store(chunks)
+    elif documents:
+        logger.warning("0 chunks — check document content")
+    else:
+        logger.info("No changes — nothing to embed")
+
+    collection = get_collection()
+    orphaned   = reconcile_collection(collection, old_registry, registry)
+
+    # Keep the BM25 index in step with the collection
+    if result["embedded"] or result["deleted"] or orphaned or not Path(settings.LEXICAL_INDEX_PATH).exists():
+        build_lexical_index(collection)
+
+    # Rewrite only on change: corpus_version() is a hash of this file
+    if registry != old_registry:
+        save_hash_registry(registry)
+    # The registry only changes with the corpus; record every completed run
+    Path(settings.INGEST_STAMP_PATH).write_text(datetime.now(timezone.utc).isoformat())
+
+    summary = {
+        "chunks"   : len(chunks),
+        "embedded" : result["embedded"],
+        "reused"   : result["reused"],
+        "removed"  : result["deleted"] + orphaned,
+        "total"    : collection.count(),
+    }
 
     logger.info("=" * 60)
     logger.info("  Ingestion complete!")
-    logger.info(f"  Chunks this run : {len(chunks)}")
-    logger.info(f"  Total in store  : {total}")
+    logger.info(f"  Chunks this run : {summary['chunks']}")
+    logger.info(f"  Embedded        : {summary['embedded']}")
+    logger.info(f"  Reused          : {summary['reused']}")
+    logger.info(f"  Vectors removed : {summary['removed']}")
+    logger.info(f"  Total in store  : {summary['total']}")
     logger.info(f"  Path            : {CHROMA_PATH}")
     logger.info("=" * 60)
     logger.info("Next step: uvicorn main:app --reload --port 8000")
+    return summary
 
 
 if __name__ == "__main__":
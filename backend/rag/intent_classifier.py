@@ -0,0 +1,116 @@
+"""
+rag/intent_classifier.py
+------------------------
+Local intent classification from per-category embedding centroids.
+
+WHY:
+  classify_intent used a full chat-completion round-trip to pick one of
+  seven labels. Every chunk in Chroma already has an embedding and a
+  category (from infer_category), so the mean embedding per category is
+  a ready-made classifier. The query embedding is the same one retrieval
+  needs, and CachedEmbeddings serves it to both.
+
+  When the top-two similarity margin is below INTENT_CENTROID_MARGIN the
+  query is ambiguous and the caller falls back to the LLM.
+"""
+
+import asyncio
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+from rag.embeddings import get_embedding_model
+from rag.store import get_store, corpus_version
+from config import get_settings
+from core.logging import setup_logger
+
+logger   = setup_logger(__name__)
+settings = get_settings()
+
+
+class CentroidIntentClassifier:
+    """
+    Nearest-centroid classifier over chunk embeddings.
+
+    Centroids are built by refresh(), called at startup and after ingestion.
+    The request path never builds them: if the corpus changed behind our
+    back, a rebuild is started in the background and the previous centroids
+    (or the LLM fallback, before the first build) serve in the meantime.
+    """
+
+    def __init__(self, labels: list, margin: float):
+        self.labels  = set(labels)
+        self.margin  = margin
+        self._lock   = threading.Lock()
+        self._centroids: Tuple[list, Optional[np.ndarray]] = ([], None)   # (names, matrix)
+        self._version: Optional[str] = None
+        self._pending: Optional[asyncio.Future] = None
+
+    def _compute_centroids(self) -> Tuple[list, Optional[np.ndarray]]:
+        collection = get_store().collection()
+        sums: dict = {}
+        counts: dict = {}
+        offset, page = 0, 5000
+        while True:
+            batch = collection.get(include=["embeddings", "metadatas"], limit=page, offset=offset)
+            for vector, meta in zip(batch["embeddings"], batch["metadatas"]):
+                category = (meta or {}).get("category")
+                if category not in self.labels:
+                    continue
+                vector = np.asarray(vector, dtype=np.float32)
+                sums[category] = sums.get(category, 0) + vector
+                counts[category] = counts.get(category, 0) + 1
+            if len(batch["ids"]) < page:
+                break
+            offset += page
+
+        names = sorted(sums)
+        if len(names) < 2:
+            return names, None
+
+        matrix = np.stack([sums[n] / counts[n] for n in names])
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        logger.info("Intent centroids built | %s", ", ".join(f"{n}={counts[n]}" for n in names))
+        return names, matrix
+
+    def refresh(self) -> bool:
+        """
+        (Re)build the centroids if the corpus changed. Blocking - call it
+        from a worker thread. Returns True when centroids are available.
+        """
+        version = corpus_version()
+        with self._lock:
+            if self._version != version and get_store().is_ready():
+                try:
+                    # One assignment, so predict() never mixes old names with a new matrix
+                    self._centroids = self._compute_centroids()
+                    self._version = version
+                except Exception as e:
+                    logger.warning("Intent centroid build failed: %s", e)
+            return self._centroids[1] is not None
+
+    def _refresh_in_background(self) -> None:
+        if self._version == corpus_version():
+            return
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.get_running_loop().run_in_executor(None, self.refresh)
+
+    def predict(self, query_vector) -> Tuple[Optional[str], float]:
+        """Returns (intent, margin). intent is None when the margin is too small."""
+        names, matrix = self._centroids
+        vector = np.asarray(query_vector, dtype=np.float32)
+        sims = matrix @ (vector / np.linalg.norm(vector))
+        order = np.argsort(sims)[::-1]
+        margin = float(sims[order[0]] - sims[order[1]])
+        intent = names[order[0]] if margin >= self.margin else None
+        return intent, margin
+
+    async def aclassify(self, query: str) -> Tuple[Optional[str], float]:
+        if not get_store().is_ready():
+            return None, 0.0
+        self._refresh_in_background()
+        if self._centroids[1] is None:
+            return None, 0.0
+        query_vector = await get_embedding_model().aembed_query(query)
+        return self.predict(query_vector)
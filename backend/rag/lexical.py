@@ -0,0 +1,186 @@
+"""
+rag/lexical.py
+--------------
+Compact in-memory BM25 index for exact-token retrieval.
+
+WHY a lexical index:
+  Embeddings blur exact tokens - plan names ("Unlimited Plus"), error codes,
+  APN strings. BM25 matches them literally. The hybrid retriever fuses both
+  result lists (see rag/retriever.py).
+
+Storage:
+  Built at ingest time from the Chroma collection and persisted as gzipped
+  JSON next to it (LEXICAL_INDEX_PATH). Postings are kept in memory as
+  parallel uint32 arrays (doc index, term frequency) per term.
+"""
+
+import re
+import gzip
+import json
+import math
+import heapq
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from langchain.schema import Document
+
+from config import get_settings
+from core.logging import setup_logger
+from core.metrics import SEARCH_LATENCY
+
+logger   = setup_logger(__name__)
+settings = get_settings()
+
+# Keeps dotted/hyphenated tokens together: "apn.novatel.com", "e-102", "5g"
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._\-][a-z0-9]+)*")
+
+BM25_K1 = 1.5
+BM25_B  = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring.
+
+    Usage:
+        index = BM25Index.build(ids, texts, metadatas)
+        hits  = index.search("unlimited plus hotspot", k=5)
+    """
+
+    def __init__(self, ids: List[str], texts: List[str], metadatas: List[dict],
+                 doc_lens: array, postings: dict):
+        self.ids       = ids
+        self.texts     = texts
+        self.metadatas = metadatas
+        self.doc_lens  = doc_lens
+        self.postings  = postings          # term -> (array doc_idx, array tf)
+        self.avgdl     = (sum(doc_lens) / len(doc_lens)) if doc_lens else 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids: List[str], texts: List[str], metadatas: List[dict]) -> "BM25Index":
+        doc_lens = array("I")
+        postings: dict = {}
+        for doc_idx, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                docs, tfs = postings.setdefault(term, (array("I"), array("I")))
+                docs.append(doc_idx)
+                tfs.append(tf)
+        return cls(list(ids), list(texts), [m or {} for m in metadatas], doc_lens, postings)
+
+    def search(self, query: str, k: int, where: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """
+        Top-k documents by BM25 score. `where` is an equality filter on
+        metadata, e.g. {"category": "billing"}, mirroring Chroma's filter.
+        """
+        with SEARCH_LATENCY.labels("bm25").time():
+            return self._search(query, k, where)
+
+    def _search(self, query: str, k: int, where: Optional[dict]) -> List[Tuple[Document, float]]:
+        n = len(self.ids)
+        if not n:
+            return []
+
+        scores: dict = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, tfs = posting
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_idx, tf in zip(docs, tfs):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens[doc_idx] / self.avgdl)
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        if where:
+            scores = {
+                i: s for i, s in scores.items()
+                if all(self.metadatas[i].get(key) == value for key, value in where.items())
+            }
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            (Document(page_content=self.texts[i], metadata=dict(self.metadatas[i])), score)
+            for i, score in top
+        ]
+
+    # ── Persistence ───────────────────────────────────────────────────────────
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "doc_lens": self.doc_lens.tolist(),
+            "postings": {t: [d.tolist(), f.tolist()] for t, (d, f) in self.postings.items()},
+        }
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        postings = {
+            t: (array("I", d), array("I", f)) for t, (d, f) in payload["postings"].items()
+        }
+        return cls(payload["ids"], payload["texts"], payload["metadatas"],
+                   array("I", payload["doc_lens"]), postings)
+
+
+def build_lexical_index(collection, path: Path = None) -> BM25Index:
+    """Rebuild the BM25 index from every chunk in the collection and persist it."""
+    path = path or Path(settings.LEXICAL_INDEX_PATH)
+    ids, texts, metas = [], [], []
+    offset, page = 0, 5000
+    while True:
+        batch = collection.get(include=["documents", "metadatas"], limit=page, offset=offset)
+        ids.extend(batch["ids"])
+        texts.extend(batch["documents"])
+        metas.extend(batch["metadatas"])
+        if len(batch["ids"]) < page:
+            break
+        offset += page
+
+    index = BM25Index.build(ids, texts, metas)
+    index.save(path)
+    logger.info("Lexical index built | %d chunks | %d terms | %s", len(index), len(index.postings), path)
+    return index
+
+
+# ── Loader: reloads automatically when ingestion rewrites the file ───────────
+
+_cache_lock = threading.Lock()
+_cached: Optional[BM25Index] = None
+_cached_mtime: Optional[int] = None
+
+
+def get_lexical_index() -> Optional[BM25Index]:
+    """Returns the persisted index, or None if ingestion has not built one yet."""
+    global _cached, _cached_mtime
+    path = Path(settings.LEXICAL_INDEX_PATH)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _cache_lock:
+        if _cached is None or mtime != _cached_mtime:
+            _cached = BM25Index.load(path)
+            _cached_mtime = mtime
+            logger.info("Lexical index loaded | %d chunks", len(_cached))
+        return _cached
@@ -13,42 +13,123 @@ Pipeline:
 
 Two reranking strategies provided
     1.LLMReranker - Uses GPT to score relevances (accurate, costs tokens)
+                    Listwise by default: all chunks scored in a single call
     2.CrossEncoderReranker - Uses a local HuggingFace model(free, fast)
+                    Requests are micro-batched into shared forward passes
 
-Default: LLMReranker (no extra dependencies needed for this project)               
+Default: LLMReranker (no extra dependencies needed for this project)
+Select with RERANKER_BACKEND = "llm" | "cross_encoder"               
 """
 
-from typing import List
+import re
+import time
+import queue
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, InvalidStateError
+from typing import List, Tuple
+from pydantic import BaseModel, Field
 from langchain.schema import Document
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 
 from config import get_settings
 from core.logging import setup_logger
+from core.metrics import llm_metrics, token_usage
 
 logger = setup_logger(__name__)
 settings = get_settings()
 
-# ── LLM-Based Reranker
+NEUTRAL_SCORE = 5.0     # Used when a chunk could not be scored
+MAX_CHUNK_CHARS = 500   # Chunk text shown to the reranker LLM
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+POINTWISE_PROMPT = """Rate how relevant this text is to answering
+Query: {query}
+Text: {text}
+
+Respond with ONLY a number from 1 to 10.
+10 = perfectly answer the query
+1 = completely irrelevant
+Number:"""
+
+LISTWISE_PROMPT = """Rate how relevant each numbered passage is to answering the query.
+
+Query: {query}
+
+Passages:
+{passages}
+
+Score EVERY passage from 1 to 10.
+10 = perfectly answers the query
+1 = completely irrelevant"""
+
 
-class LLMReranker:
+def parse_score(raw) -> float:
     """
-    Uses GPT to score how relevant each chunk is to the query.
-    Scores chunks 1-10 and returns top_n highest-scored chunks.
+    Extract a 1-10 relevance score from an LLM reply.
+    Tolerates replies like "8", "Score: 7.5" or "9/10".
+    Falls back to NEUTRAL_SCORE when no number is found.
+    """
+    if isinstance(raw, (int, float)):
+        value = float(raw)
+    else:
+        match = _NUMBER_RE.search(str(raw))
+        if not match:
+            return NEUTRAL_SCORE
+        value = float(match.group())
+    return min(max(value, 1.0), 10.0)
 
-    Cost: Small - uses gpt-4o-mini with very short prompts.
-    Accuracy: High -- LLM understands semantic nuance.
+
+class PassageScore(BaseModel):
+    """Relevance score for a single numbered passage."""
+    index: int = Field(..., description="Passage number as shown in the prompt")
+    score: float = Field(..., description="Relevance from 1 (irrelevant) to 10 (perfect)")
+
+
+class ListwiseScores(BaseModel):
+    """Structured output for scoring all passages in one call."""
+    scores: List[PassageScore]
+
+
+# ── Reranker Base
+
+class BaseReranker(ABC):
+    """
+    Shared rerank()/arerank() logic. Subclasses implement score()/ascore()
+    returning one relevance score per document, higher = more relevant.
     """
 
-    def __init__(self, top_n: int = None):
-        self.top_n = top_n or settings.RERANKER_TOP_N
-        self.llm = ChatOpenAI(
-            model=settings.CHAT_MODEL,
-            temperature=0,
-            openai_api_key=settings.OPENAI_API_KEY
-            
+    name = "base"
+    top_n: int
+
+    @abstractmethod
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        ...
+
+    @abstractmethod
+    async def ascore(self, query: str, documents: List[Document]) -> List[float]:
+        ...
+
+    async def ascore_with_usage(self, query: str, documents: List[Document]) -> Tuple[List[float], int]:
+        """ascore() plus the LLM tokens it spent (0 for local models)."""
+        return await self.ascore(query, documents), 0
+
+    def _select(self, documents: List[Document], scores: List[float]) -> List[Document]:
+        scored = sorted(zip(scores, documents), key=lambda x: x[0], reverse=True)
+        for score, doc in scored:
+            doc.metadata["rerank_score"] = score
+            logger.debug("Chunk score: %.1f | %.60s...", score, doc.page_content)
+
+        top_docs = [doc for _, doc in scored[:self.top_n]]
+        logger.info(
+            "Reranked %d chunks (%s) -> kept top %d | Top score: %.1f",
+            len(documents), self.name, len(top_docs), scored[0][0],
         )
-    
+        return top_docs
+
     def rerank(self, query: str, documents: List[Document]) ->List[Document]:
         """
         Score each document and return top_n sorted by relevance.
@@ -58,110 +139,298 @@ class LLMReranker:
             documents: List of retrieved Document chunks
 
         Returns:
-            Top N documents sorted by relevance score(highest first)
+            Top N documents sorted by relevance score(highest first).
+            Each kept document carries metadata["rerank_score"].
         """
         if not documents:
             return []
-        
-        scored = []
+        return self._select(documents, self.score(query, documents))
 
-        for doc in documents:
-            prompt = f"""Rate how relevant this text is to answering
-Query: {query}
-Text: {doc.page_content[:500]}
+    async def arerank(self, query: str, documents: List[Document]) -> List[Document]:
+        """Async variant of rerank()."""
+        if not documents:
+            return []
+        return self._select(documents, await self.ascore(query, documents))
 
-Respond with ONLY a number from 1 to 10.
-10 = perfectly answer the query
-1 = completely irrelevant
-Number:"""
+# ── LLM-Based Reranker
+
+class LLMReranker(BaseReranker):
+    """
+    Uses GPT to score how relevant each chunk is to the query.
+    Scores chunks 1-10 and returns top_n highest-scored chunks.
+
+    Modes (settings.RERANKER_MODE):
+        listwise  - all chunks scored in ONE structured-output call (default)
+        pointwise - one short call per chunk, sent concurrently
+
+    Listwise falls back to pointwise if the structured call fails.
+
+    Cost: Small - uses gpt-4o-mini with very short prompts.
+    Accuracy: High -- LLM understands semantic nuance.
+    """
+
+    def __init__(self, top_n: int = None, mode: str = None):
+        self.top_n = top_n or settings.RERANKER_TOP_N
+        self.mode = mode or settings.RERANKER_MODE
+        self.name = f"llm/{self.mode}"
+        self.llm = ChatOpenAI(
+            model=settings.CHAT_MODEL,
+            temperature=0,
+            openai_api_key=settings.OPENAI_API_KEY,
+            stream_usage=True,          # usage_metadata on streamed calls too (token metrics)
+            callbacks=[llm_metrics],
+        )
+        # include_raw: keep the AIMessage, which carries the token usage
+        self.listwise_llm = self.llm.with_structured_output(ListwiseScores, include_raw=True)
+        self.batch_config = {"max_concurrency": settings.RERANKER_MAX_CONCURRENCY}
+
+    # ── Prompt builders ───────────────────────────────────────────────────────
+
+    def _pointwise_messages(self, query: str, documents: List[Document]) -> list:
+        return [
+            [HumanMessage(content=POINTWISE_PROMPT.format(
+                query=query, text=doc.page_content[:MAX_CHUNK_CHARS]
+            ))]
+            for doc in documents
+        ]
+
+    def _listwise_messages(self, query: str, documents: List[Document]) -> list:
+        passages = "\n\n".join(
+            f"[{i}] {doc.page_content[:MAX_CHUNK_CHARS]}"
+            for i, doc in enumerate(documents, 1)
+        )
+        return [HumanMessage(content=LISTWISE_PROMPT.format(query=query, passages=passages))]
+
+    @staticmethod
+    def _listwise_to_scores(result: dict, count: int) -> List[float]:
+        """Map structured output back onto document order. Missing entries get NEUTRAL_SCORE."""
+        if result["parsed"] is None:
+            raise result.get("parsing_error") or ValueError("no structured output")
+        scores = [NEUTRAL_SCORE] * count
+        for item in result["parsed"].scores:
+            if 1 <= item.index <= count:
+                scores[item.index - 1] = parse_score(item.score)
+        return scores
+
+    @staticmethod
+    def _batch_to_scores(responses: list) -> List[float]:
+        return [
+            NEUTRAL_SCORE if isinstance(r, Exception) else parse_score(r.content)
+            for r in responses
+        ]
+
+    # ── Scoring ───────────────────────────────────────────────────────────────
+
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        """Return one relevance score per document, in input order."""
+        if self.mode == "listwise":
             try:
-                response = self.llm.invoke([HumanMessage(content=prompt)])
-                score = float(response.content.strip())
-            except Exception:
-                score = 5.0   # Default neutral score on failure
+                result = self.listwise_llm.invoke(self._listwise_messages(query, documents))
+                return self._listwise_to_scores(result, len(documents))
+            except Exception as e:
+                logger.warning("Listwise rerank failed, falling back to pointwise: %s", e)
 
-            scored.append((score, doc))
-            logger.debug(f"Chunk score: {score:.1f} | {doc.page_content[:60]}...")
+        responses = self.llm.batch(
+            self._pointwise_messages(query, documents),
+            config=self.batch_config,
+            return_exceptions=True,
+        )
+        return self._batch_to_scores(responses)
 
-        # Sort descending by score, return top_n
-        scored.sort(key=lambda x: x[0], reverse=True)
-        top_docs = [doc for _, doc in scored[:self.top_n]]
+    async def ascore(self, query: str, documents: List[Document]) -> List[float]:
+        """Async variant of score() - pointwise calls run concurrently via abatch."""
+        scores, _ = await self.ascore_with_usage(query, documents)
+        return scores
+
+    async def ascore_with_usage(self, query: str, documents: List[Document]) -> Tuple[List[float], int]:
+        tokens = 0
+        if self.mode == "listwise":
+            try:
+                result = await self.listwise_llm.ainvoke(self._listwise_messages(query, documents))
+                tokens += token_usage(result.get("raw"))
+                return self._listwise_to_scores(result, len(documents)), tokens
+            except Exception as e:
+                logger.warning("Listwise rerank failed, falling back to pointwise: %s", e)
+
+        responses = await self.llm.abatch(
+            self._pointwise_messages(query, documents),
+            config=self.batch_config,
+            return_exceptions=True,
+        )
+        tokens += sum(token_usage(r) for r in responses if not isinstance(r, Exception))
+        return self._batch_to_scores(responses), tokens
 
-        logger.info(
-            f"Reranked {len(documents)} chunks -> kept top {len(top_docs)} | "
-            f"Top score: {scored[0][0]:.1f}"
-        )   
-        
-        return top_docs
-    
 # ── Cross-Encoder Reranker (Optional — No API cost) ───────────────────────────
 
-# class CrossEncoderReranker:
-#     """
-#     Uses a local HuggingFace cross-encoder model.
-#     No API cost. Runs on CPU. Slightly slower than LLMReranker.
-
-#     Requires: pip install sentence-transformers
-#     Model: cross-encoder/ms-marco-MiniLM-L-6-v2 (fast, accurate)
-
-#     Usuage:
-#          reranker = CrossEncoderReranker()
-#          top_docs = reranker.rerank(query, documents)
-#     """
-
-#     def __init__(self, top_n: int = None):
-#         self.top_n = top_n or settings.RERANKER_TOP_N
-#         self._model = None # Lazy load - only import if this is used
-
-#     def _load_model(self):
-#         if self._model is None:
-#             try:
-#                 from sentence_transformers import CrossEncoder
-#                 self._model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
-#                 logger.info("CrossEncoder model loaded")
-#             except ImportError:
-#                 raise ImportError(
-#                     "sentence-transformers not installed."
-#                     "Run: pip install sentence-transformers"
-#                 )
-    
-#     def rerank(self, query: str, documents: List[Document]) -> List[Document]:
-#         self._load_model()
-
-#         if not documents:
-#             return []
-        
-#         pairs = [[query, doc.page_content] for doc in documents]
-#         scores = self._model.predict(pairs)
-
-#         scored = list(zip(scores, documents))
-#         scored.sort(key=lambda x: x[0], reverse=True)
-#         top_docs = [doc for _, doc in scored[:self.top_n]]
-
-#         logger.info(f"CrossEncoder reranked {len(documents)} →{len(top_docs)} chunks")
-#         return top_docs
+class _PairBatcher:
+    """
+    Micro-batches (query, chunk) pairs from concurrent requests into a single
+    forward pass.
+
+    Callers enqueue their pairs and get a Future back. A small dedicated pool
+    of worker threads drains the queue: each worker takes the first waiting
+    request, keeps collecting for up to max_wait_ms (or until max_batch pairs),
+    runs ONE predict() call, then splits the scores back per request.
+    """
+
+    def __init__(self, predict_fn, max_batch: int, max_wait_ms: float, workers: int):
+        self._predict = predict_fn
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[tuple[list, Future]]" = queue.Queue()
+        # Daemon threads: an idle worker must never block interpreter shutdown
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"cross-encoder-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, pairs: list) -> Future:
+        future: Future = Future()
+        self._queue.put((pairs, future))
+        return future
+
+    def _collect(self) -> list:
+        """
+        Block for the first live request, then gather more until the batch is
+        full or max_wait_ms has passed. Requests whose caller already gave up
+        (cancelled future: timeout, disconnect, cancelled batch) are dropped;
+        the rest are marked running, so they can no longer be cancelled.
+        """
+        batch, size, deadline = [], 0, None
+        while size < self._max_batch:
+            if deadline is None:
+                item = self._queue.get()
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if not item[1].set_running_or_notify_cancel():
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self._max_wait
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    @staticmethod
+    def _resolve(future: Future, result=None, error: Exception = None) -> None:
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _worker_loop(self) -> None:
+        # Nothing may escape this loop: a dead worker hangs every later rerank
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                pairs = [pair for item_pairs, _ in batch for pair in item_pairs]
+                scores = self._predict(pairs)
+
+                offset = 0
+                for item_pairs, future in batch:
+                    self._resolve(future, [float(s) for s in scores[offset: offset + len(item_pairs)]])
+                    offset += len(item_pairs)
+                logger.debug("CrossEncoder batch: %d requests | %d pairs", len(batch), len(pairs))
+            except Exception as e:
+                for _, future in batch:
+                    self._resolve(future, error=e)
+
+
+class CrossEncoderReranker(BaseReranker):
+    """
+    Uses a local HuggingFace cross-encoder model.
+    No API cost. Runs on CPU in a dedicated thread pool, so the event loop
+    never blocks on a forward pass.
+
+    Requires: pip install sentence-transformers
+    Model: cross-encoder/ms-marco-MiniLM-L6-v2 (fast, accurate)
+    Optional: set CROSS_ENCODER_ONNX_FILE (e.g. "onnx/model_qint8_avx512.onnx")
+              to run the int8-quantized ONNX export (needs onnxruntime).
+
+    Usuage:
+         reranker = CrossEncoderReranker()
+         top_docs = reranker.rerank(query, documents)
+    """
+
+    name = "cross_encoder"
+
+    def __init__(self, top_n: int = None):
+        self.top_n = top_n or settings.RERANKER_TOP_N
+        self._model = None # Lazy load - only import if this is used
+        self._lock = threading.Lock()
+        self._batcher = _PairBatcher(
+            predict_fn=self._predict,
+            max_batch=settings.CROSS_ENCODER_MAX_BATCH,
+            max_wait_ms=settings.CROSS_ENCODER_BATCH_WAIT_MS,
+            workers=settings.CROSS_ENCODER_WORKERS,
+        )
+
+    def _load_model(self):
+        with self._lock:
+            if self._model is not None:
+                return self._model
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                raise ImportError(
+                    "sentence-transformers not installed. "
+                    "Run: pip install sentence-transformers"
+                )
+
+            kwargs = {"max_length": 512, "device": "cpu"}
+            if settings.CROSS_ENCODER_ONNX_FILE:
+                kwargs["backend"] = "onnx"
+                kwargs["model_kwargs"] = {"file_name": settings.CROSS_ENCODER_ONNX_FILE}
+
+            self._model = CrossEncoder(settings.CROSS_ENCODER_MODEL, **kwargs)
+            logger.info(
+                "CrossEncoder model loaded | %s | onnx=%s",
+                settings.CROSS_ENCODER_MODEL, settings.CROSS_ENCODER_ONNX_FILE or "off",
+            )
+            return self._model
+
+    def _predict(self, pairs: list) -> list:
+        model = self._load_model()
+        return model.predict(
+            pairs,
+            batch_size=settings.CROSS_ENCODER_MAX_BATCH,
+            show_progress_bar=False,
+        )
+
+    def _pairs(self, query: str, documents: List[Document]) -> list:
+        return [(query, doc.page_content) for doc in documents]
+
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        return self._batcher.submit(self._pairs(query, documents)).result()
+
+    async def ascore(self, query: str, documents: List[Document]) -> List[float]:
+        return await asyncio.wrap_future(self._batcher.submit(self._pairs(query, documents)))
 
 # ----Factory -- get default reranker
 
-def get_reranker() -> LLMReranker:
+def get_reranker() -> BaseReranker:
     """
-    Returns  the default reranker instance.
+    Returns the reranker selected by settings.RERANKER_BACKEND.
+
+        llm           - LLMReranker (default, no extra dependencies)
+        cross_encoder - CrossEncoderReranker (local CPU model, zero API cost)
 
-    Swithch to CrossEncoderReranker() here if you want zero API cost
-reranking
     Usage:
          from rag.reranker import get_reranker
          reranker = get_reranker()
          top_docs = reranker.rerank(query, retrieved_docs)
     """
+    if settings.RERANKER_BACKEND == "cross_encoder":
+        return CrossEncoderReranker(top_n=settings.RERANKER_TOP_N)
     return LLMReranker(top_n=settings.RERANKER_TOP_N)
-
-    
-            
-    
-    
-    
-    
-        
-
-
@@ -1,86 +1,169 @@
 """
 rag/retriever.py
 ----------------
-Vector store retriever using ChromaDB PersistentClient.
+Vector store retriever over the shared ChromaDB store.
 Compatible with ChromaDB 0.5.18.
+
+Modes (settings.RETRIEVER_MODE):
+    mmr    - MMR over embeddings only
+    hybrid - MMR + BM25 run concurrently, fused with reciprocal rank fusion
+
+Both retrievers accept per-call overrides:
+    retriever.invoke(query, k=..., fetch_k=..., filter={"category": ...})
 """
 
 import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+from langchain.schema import Document
 from langchain_chroma import Chroma
-from langchain_core.vectorstores import VectorStoreRetriever
-
-from rag.embeddings import get_embedding_model
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.retrievers import BaseRetriever
+
+from rag.store import get_store
+from rag.lexical import get_lexical_index
 from core.logging import setup_logger
-from core.exceptions import VectorStoreNotReadyError
 from config import get_settings
 
 logger   = setup_logger(__name__)
 settings = get_settings()
 
+# Runs the vector and lexical searches side by side for sync callers
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
 
 def get_vectorstore() -> Chroma:
     """
-    Load ChromaDB using PersistentClient — guaranteed to read from disk.
+    Returns the shared ChromaDB vector store (see rag/store.py).
+    Raises VectorStoreNotReadyError if ingestion has never run.
     """
-    chroma_path = Path(settings.CHROMA_PATH)
-
-    if not chroma_path.exists():
-        raise VectorStoreNotReadyError()
-
-    # Check sqlite file exists
-    sqlite_file = chroma_path / "chroma.sqlite3"
-    if not sqlite_file.exists():
-        raise VectorStoreNotReadyError()
-
-    embeddings = get_embedding_model()
-
-    # Use PersistentClient directly — most reliable for 0.5.x
-    client = chromadb.PersistentClient(
-        path=str(chroma_path),
-        settings=ChromaSettings(anonymized_telemetry=False)
-    )
+    return get_store().vectorstore()
 
-    vectorstore = Chroma(
-        client=client,
-        collection_name=settings.COLLECTION_NAME,
-        embedding_function=embeddings,
-    )
 
-    count = vectorstore._collection.count()
-    logger.info(
-        f"Vector store loaded | "
-        f"Collection: {settings.COLLECTION_NAME} | "
-        f"Chunks: {count}"
-    )
-
-    return vectorstore
+def reciprocal_rank_fusion(ranked_lists: list, k: int, rrf_k: int) -> List[Document]:
+    """
+    Fuse ranked result lists: score(d) = sum(weight / (rrf_k + rank)).
 
+    Args:
+        ranked_lists: [(documents_in_rank_order, weight), ...]
+        k: number of fused documents to return
+        rrf_k: rank damping constant (60 is the usual default)
+    """
+    scores: dict = {}
+    docs: dict = {}
+    for documents, weight in ranked_lists:
+        for rank, doc in enumerate(documents, 1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+            docs.setdefault(key, doc)
+
+    fused = []
+    for key in sorted(scores, key=scores.get, reverse=True)[:k]:
+        doc = docs[key]
+        doc.metadata["rrf_score"] = scores[key]
+        fused.append(doc)
+    return fused
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Vector MMR + BM25, fused with weighted reciprocal rank fusion.
+    Falls back to vector-only results if no lexical index has been built.
+    """
 
-def get_retriever() -> VectorStoreRetriever:
+    vectorstore: Chroma
+    k: int
+    fetch_k: int
+    lambda_mult: float
+    vector_weight: float
+    lexical_weight: float
+    rrf_k: int
+
+    def _params(self, kwargs: dict) -> tuple:
+        return kwargs.get("k", self.k), kwargs.get("fetch_k", self.fetch_k), kwargs.get("filter")
+
+    def _vector_search(self, query: str, k: int, fetch_k: int, where: Optional[dict]) -> List[Document]:
+        return self.vectorstore.max_marginal_relevance_search(
+            query, k=k, fetch_k=fetch_k, lambda_mult=self.lambda_mult, filter=where
+        )
+
+    def _lexical_search(self, query: str, k: int, where: Optional[dict]) -> List[Document]:
+        index = get_lexical_index()
+        if index is None:
+            return []
+        return [doc for doc, _ in index.search(query, k, where)]
+
+    def _fuse(self, vector_docs: List[Document], lexical_docs: List[Document], k: int) -> List[Document]:
+        logger.debug("Hybrid candidates | vector=%d | lexical=%d", len(vector_docs), len(lexical_docs))
+        return reciprocal_rank_fusion(
+            [(vector_docs, self.vector_weight), (lexical_docs, self.lexical_weight)],
+            k=k,
+            rrf_k=self.rrf_k,
+        )
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs
+    ) -> List[Document]:
+        k, fetch_k, where = self._params(kwargs)
+        vector = _search_pool.submit(self._vector_search, query, k, fetch_k, where)
+        lexical = _search_pool.submit(self._lexical_search, query, k, where)
+        return self._fuse(vector.result(), lexical.result(), k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, **kwargs
+    ) -> List[Document]:
+        k, fetch_k, where = self._params(kwargs)
+        vector_docs, lexical_docs = await asyncio.gather(
+            self.vectorstore.amax_marginal_relevance_search(
+                query, k=k, fetch_k=fetch_k, lambda_mult=self.lambda_mult, filter=where
+            ),
+            asyncio.to_thread(self._lexical_search, query, k, where),
+        )
+        return self._fuse(vector_docs, lexical_docs, k)
+
+
+def get_retriever() -> BaseRetriever:
     """
-    Returns MMR retriever from the loaded vector store.
+    Returns the retriever selected by settings.RETRIEVER_MODE
+    (MMR by default, or hybrid MMR + BM25).
     """
     vectorstore = get_vectorstore()
 
-    retriever = vectorstore.as_retriever(
-        search_type="mmr",
-        search_kwargs={
-            "k"           : settings.RETRIEVER_K,
-            "fetch_k"     : settings.RETRIEVER_FETCH_K,
-            "lambda_mult" : settings.RETRIEVER_LAMBDA,
-        }
-    )
+    if settings.RETRIEVER_MODE == "hybrid":
+        retriever = HybridRetriever(
+            vectorstore=vectorstore,
+            k=settings.RETRIEVER_K,
+            fetch_k=settings.RETRIEVER_FETCH_K,
+            lambda_mult=settings.RETRIEVER_LAMBDA,
+            vector_weight=settings.HYBRID_VECTOR_WEIGHT,
+            lexical_weight=settings.HYBRID_LEXICAL_WEIGHT,
+            rrf_k=settings.HYBRID_RRF_K,
+        )
+        if get_lexical_index() is None:
+            logger.warning("Lexical index not found — hybrid retrieval is vector-only until re-ingestion")
+    else:
+        retriever = vectorstore.as_retriever(
+            search_type="mmr",
+            search_kwargs={
+                "k"           : settings.RETRIEVER_K,
+                "fetch_k"     : settings.RETRIEVER_FETCH_K,
+                "lambda_mult" : settings.RETRIEVER_LAMBDA,
+            }
+        )
 
     logger.info(
         f"Retriever ready | "
+        f"mode={settings.RETRIEVER_MODE} | "
         f"k={settings.RETRIEVER_K} | "
         f"fetch_k={settings.RETRIEVER_FETCH_K} | "
         f"lambda={settings.RETRIEVER_LAMBDA}"
     )
 
-    return retriever
\ No newline at end of file
+    return retriever
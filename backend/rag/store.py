@@ -0,0 +1,173 @@
+"""
+rag/store.py
+------------
+Process-wide ChromaDB client and vector store registry.
+
+WHY a registry:
+  Opening a PersistentClient re-reads sqlite and loads the HNSW index.
+  Retriever, health, admin and ingestion used to open their own client on
+  every call. Now they all share ONE client/collection/vector store,
+  opened lazily on first use and closed by the FastAPI lifespan.
+
+Usage:
+    from rag.store import get_store
+    collection = get_store().collection()
+    vectorstore = get_store().vectorstore()
+"""
+
+import sys
+import json
+import hashlib
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+from langchain_chroma import Chroma
+
+from rag.embeddings import get_embedding_model
+from core.logging import setup_logger
+from core.exceptions import VectorStoreNotReadyError
+from core.metrics import SEARCH_LATENCY
+from config import get_settings
+
+logger   = setup_logger(__name__)
+settings = get_settings()
+
+COLLECTION_METADATA = {"hnsw:space": "cosine"}
+
+
+class TimedChroma(Chroma):
+    """Chroma wrapper that records search latency (after the query is embedded)."""
+
+    def max_marginal_relevance_search_by_vector(self, *args, **kwargs):
+        with SEARCH_LATENCY.labels("chroma_mmr").time():
+            return super().max_marginal_relevance_search_by_vector(*args, **kwargs)
+
+    def similarity_search_by_vector(self, *args, **kwargs):
+        with SEARCH_LATENCY.labels("chroma_similarity").time():
+            return super().similarity_search_by_vector(*args, **kwargs)
+
+
+class VectorStoreRegistry:
+    """
+    Lazily opened, thread-safe holder for the shared Chroma objects.
+    """
+
+    def __init__(self, chroma_path: str, collection_name: str):
+        self.chroma_path     = Path(chroma_path)
+        self.collection_name = collection_name
+        self._lock        = threading.RLock()
+        self._client      = None
+        self._collection  = None
+        self._vectorstore = None
+
+    def is_ready(self) -> bool:
+        """True when a persisted store exists on disk (no client is opened)."""
+        return (self.chroma_path / "chroma.sqlite3").exists()
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self.chroma_path.mkdir(parents=True, exist_ok=True)
+                self._client = chromadb.PersistentClient(
+                    path=str(self.chroma_path),
+                    settings=ChromaSettings(anonymized_telemetry=False)
+                )
+                logger.info("Chroma client opened | Path: %s", self.chroma_path)
+            return self._client
+
+    def collection(self):
+        with self._lock:
+            if self._collection is None:
+                self._collection = self.client().get_or_create_collection(
+                    name=self.collection_name,
+                    metadata=COLLECTION_METADATA,
+                )
+            return self._collection
+
+    def vectorstore(self) -> TimedChroma:
+        """
+        LangChain wrapper over the shared collection.
+        Raises VectorStoreNotReadyError if ingestion has never run.
+        """
+        with self._lock:
+            if self._vectorstore is None:
+                if not self.is_ready():
+                    raise VectorStoreNotReadyError()
+
+                self._vectorstore = TimedChroma(
+                    client=self.client(),
+                    collection_name=self.collection_name,
+                    embedding_function=get_embedding_model(),
+                    collection_metadata=COLLECTION_METADATA,
+                )
+                logger.info(
+                    "Vector store loaded | Collection: %s | Chunks: %d",
+                    self.collection_name, self.collection().count(),
+                )
+            return self._vectorstore
+
+    def close(self) -> None:
+        """Release the client and its sqlite/HNSW resources."""
+        with self._lock:
+            if self._client is None:
+                return
+            try:
+                self._client.clear_system_cache()
+            except Exception as e:
+                logger.warning("Chroma client close failed: %s", e)
+            self._client      = None
+            self._collection  = None
+            self._vectorstore = None
+            logger.info("Chroma client closed")
+
+
+_registry = VectorStoreRegistry(settings.CHROMA_PATH, settings.COLLECTION_NAME)
+
+
+def chunk_id(source_file: str, text: str) -> str:
+    """
+    Chroma id of a chunk: hash of (source_file, content). Namespaced by file
+    because ownership and deletion are per source_file - two files that
+    share a chunk must not share (and then delete) one vector.
+    """
+    return hashlib.sha256(f"{source_file}\x00{text}".encode("utf-8")).hexdigest()
+
+
+_version_cache: tuple = (None, "none")       # ((mtime_ns, size), version)
+
+
+def corpus_version() -> str:
+    """
+    Identifier of the indexed corpus: a hash of the per-file content hashes
+    in the hash registry. A no-op ingest (or a touched-but-unchanged file)
+    leaves it unchanged, so caches derived from the index (answer cache,
+    intent centroids) survive it. The registry is only re-read when its
+    mtime/size change, so calling this per request is one stat().
+    """
+    global _version_cache
+    path = Path(settings.HASH_REGISTRY_PATH)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return "none"
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached_signature, version = _version_cache
+    if cached_signature != signature:
+        registry = json.loads(path.read_text())
+        # Legacy registries stored the content hash as a plain string
+        content = {
+            name: entry.get("content_hash") if isinstance(entry, dict) else entry
+            for name, entry in registry.items()
+        }
+        raw = json.dumps(content, sort_keys=True).encode("utf-8")
+        version = hashlib.sha256(raw).hexdigest()[:16]
+        _version_cache = (signature, version)
+    return version
+
+
+def get_store() -> VectorStoreRegistry:
+    """Returns the process-wide vector store registry."""
+    return _registry
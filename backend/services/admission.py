@@ -0,0 +1,129 @@
+"""
+services/admission.py
+---------------------
+Admission control for agent runs: a concurrency limit with a bounded
+FIFO wait queue and a queue-time deadline.
+
+WHY:
+  Every chat request fans out into several OpenAI calls. Accepting all of
+  them during a spike makes everyone slow and trips upstream rate limits.
+  Capping concurrent agent runs keeps admitted requests fast; requests
+  that cannot start within ADMISSION_QUEUE_TIMEOUT_S (or find the queue
+  full) are shed immediately with 503 + Retry-After, instead of timing
+  out after burning tokens.
+
+Usage:
+    async with chat_admission.slot():
+        result = await agent.ainvoke(state)
+
+Cache hits and coalesced requests never take a slot (see chat_service).
+"""
+
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+from config import get_settings
+from core.logging import setup_logger
+from core.exceptions import ServiceOverloadedError
+from core.metrics import ADMISSION_WAIT, ADMISSION_REJECTED
+
+logger   = setup_logger(__name__)
+settings = get_settings()
+
+
+class AdmissionController:
+    """
+    Event-loop-local slot pool. Not thread-safe; use from async code only.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue      = max_queue
+        self.queue_timeout  = queue_timeout
+        self.active   = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+        self._service_time = 1.0            # EWMA of slot hold time, seconds
+
+    def retry_after(self) -> int:
+        """Rough seconds until a newly queued request would get a slot."""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self._service_time * backlog / self.max_concurrent))
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTED.labels(reason).inc()
+        retry_after = self.retry_after()
+        logger.warning(
+            "Request shed | %s | active=%d queued=%d | retry_after=%ds",
+            reason, self.active, len(self._waiters), retry_after,
+        )
+        raise ServiceOverloadedError(reason, retry_after)
+
+    async def acquire(self) -> None:
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            ADMISSION_WAIT.observe(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            self._reject("deadline")
+        except BaseException:
+            self._forget(waiter)
+            raise
+        ADMISSION_WAIT.observe(time.perf_counter() - start)
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        """Drop a waiter that gave up; pass its slot on if one was already handed over."""
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        if waiter.done() and not waiter.cancelled():
+            self.release()
+
+    def release(self) -> None:
+        # Hand the slot straight to the next live waiter (active stays the same)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        if not settings.ADMISSION_ENABLED:
+            yield
+            return
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._service_time = 0.9 * self._service_time + 0.1 * (time.perf_counter() - start)
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
+chat_admission = AdmissionController(
+    max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_S,
+)
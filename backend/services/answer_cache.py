@@ -0,0 +1,129 @@
+"""
+services/answer_cache.py
+------------------------
+Semantic response cache in front of the agent.
+
+WHY:
+  Most traffic is the same dozen billing/roaming questions phrased
+  differently. A history-free turn whose query embedding is close enough
+  to a previously answered one can reuse that answer and skip the whole
+  classify -> retrieve -> rerank -> generate graph.
+
+Design:
+  - Query vectors live in one preallocated float32 matrix, so a lookup
+    is a single matrix-vector product over the live slots.
+  - Entries are tagged with the corpus version; re-ingestion makes
+    every older entry invisible and they are purged on the next access.
+  - Bounded size with LRU eviction.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from models.schemas import ChatResponse
+from rag.store import corpus_version
+from config import get_settings
+from core.logging import setup_logger
+
+logger   = setup_logger(__name__)
+settings = get_settings()
+
+
+class SemanticAnswerCache:
+    """
+    Nearest-neighbour cache: query embedding -> ChatResponse.
+
+    Usage:
+        cached = answer_cache.lookup(vector)
+        ...
+        answer_cache.put(vector, response, version)
+    """
+
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = max_entries
+        self.threshold   = threshold
+        self._lock    = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()   # slot -> (response, version), LRU order
+        self._free    = list(range(max_entries - 1, -1, -1))
+        self._version = None
+        self.hits     = 0
+        self.misses   = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def _check_version(self) -> str:
+        """Drop everything cached for an older corpus."""
+        version = corpus_version()
+        if version != self._version:
+            if self._entries:
+                logger.info("Corpus changed — dropping %d cached answers", len(self._entries))
+            self._entries.clear()
+            self._free = list(range(self.max_entries - 1, -1, -1))
+            self._version = version
+        return version
+
+    def lookup(self, vector) -> Optional[ChatResponse]:
+        query = self._normalize(vector)
+        with self._lock:
+            self._check_version()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            slots = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+            sims  = self._vectors[slots] @ query
+            best  = int(np.argmax(sims))
+
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            slot = int(slots[best])
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            logger.info("Answer cache hit | similarity=%.3f", sims[best])
+            return self._entries[slot][0]
+
+    def put(self, vector, response: ChatResponse, version: str = None) -> None:
+        """
+        `version` is corpus_version() captured when the request started; an
+        answer built from a corpus that was re-ingested meanwhile is dropped.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            current = self._check_version()
+            if version is not None and version != current:
+                return
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot, _ = self._entries.popitem(last=False)   # evict least recently used
+
+            self._vectors[slot] = query
+            self._entries[slot] = (response, current)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+answer_cache = SemanticAnswerCache(
+    max_entries=settings.ANSWER_CACHE_SIZE,
+    threshold=settings.ANSWER_CACHE_THRESHOLD,
+)
@@ -15,42 +15,37 @@ WHY a service layer:
 """
 
 import time
-from typing import Tuple, List
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage, AIMessage
 
 from agent.graph import agent
-from models.schemas import ChatResponse, SourceDocument
+from agent.nodes import is_low_confidence, needs_escalation
+from models.schemas import ChatRequest, ChatResponse, SourceDocument, BatchChatResult
 from models.state import AgentState
-from services.session_service import get_history, save_history
-from core.logging import setup_logger
-from core.exceptions import AgentInvocationError
+from rag.embeddings import get_embedding_model, normalize_text
+from rag.store import corpus_version
+from services.answer_cache import answer_cache
+from services.session_service import get_history, get_summary, append_history
+from services.memory_service import summary_enabled
+from services.admission import chat_admission
+from core.logging import setup_logger, session_id_var
+from core.exceptions import AgentInvocationError, ServiceOverloadedError
+from core.metrics import COALESCED_REQUESTS
 from config import get_settings
 
 logger = setup_logger(__name__)
 settings = get_settings()
 
-async def process_chat(session_id: str, message: str) -> ChatResponse:
-    """
-    Full chat Processing pipeline:
-       1. Load session history
-       2. Build initial Langgraph state
-       3. Invoke agent
-       4. Persist updated session history
-       5. Format and return ChatResponse
-    Args:
-         session_id: Unique session identifier from frontend
-         message: Current user query
-    
-    Returns:
-        ChatResponse Pydantic model ready for JSON serialization
-    """
-    start_time = time.time()
-    logger.info(f"Processing chat | Session: {session_id} | Query: '{message[:60]}...'")
-    # ── Step 1: Load session history ──────────────────────────────────────────
-    history = get_history(session_id)
+# Graph nodes whose completion is reported as a stage event while streaming
+STREAM_STAGES = ("classify_intent", "rerank_documents")
 
-    # ── Step 2: Build initial state ───────────────────────────────────────────
-    initial_state: AgentState = {
+
+def build_initial_state(session_id: str, message: str, history: list) -> AgentState:
+    return {
         "messages": history,
+        "summary": get_summary(session_id) if summary_enabled() else None,
         "session_id": session_id,
         "user_query": message,
         "intent": None,
@@ -60,21 +55,18 @@ async def process_chat(session_id: str, message: str) -> ChatResponse:
         "sources": [],
         "needs_escalation": False,
         "iteration_count": 0,
+        "seen_ids": [],
+        "scored_docs": [],
+        "tokens_used": 0,
+        "started_at": time.monotonic(),
+        "retry_pending": False,
+        "retry_count": 0,
+        "retry_reason": None,
     }
-    
-    # ── Step 3: Invoke agent ──────────────────────────────────────────────────
-    try:
-        result: AgentState = agent.invoke(initial_state)
-    except Exception as e:
-        logger.error(f"Agent invocation failed: {e}", exc_info=True)
-        raise AgentInvocationError(str(e))
-    
-    # ── Step 4: Persist updated history ───────────────────────────────────────
-    save_history(session_id, result.get("messages", []))
 
-    # ── Step 5: Format response ───────────────────────────────────────────────
-    raw_sources = result.get("sources", [])
-    sources = [
+
+def format_sources(raw_sources: List[dict]) -> List[SourceDocument]:
+    return [
         SourceDocument(
             content=doc["content"][:300],   # Truncate for UI display
             source_file=doc["source_file"],
@@ -84,25 +76,424 @@ async def process_chat(session_id: str, message: str) -> ChatResponse:
         for doc in raw_sources[:3]   # Max 3 source citations in UI
     ]
 
-    processing_ms = int((time.time() - start_time) * 1000)
-    confidence = 0.90 if raw_sources else 0.40
-    
-    response = ChatResponse(
+
+def serialize_sources(sources: List[SourceDocument]) -> List[dict]:
+    """JSON-safe sources for the stream. 'source' is the key the UI renders."""
+    return [
+        {
+            "source": s.source_file,
+            "category": s.category,
+            "score": s.relevance_score,
+            "content": s.content,
+        }
+        for s in sources
+    ]
+
+async def check_answer_cache(session_id: str, message: str, history: list) -> tuple:
+    """
+    Semantic cache lookup for history-free turns (an answer that depends
+    on earlier turns must never be reused). Returns (query_vector, response);
+    query_vector is None when the cache does not apply, response is None on miss.
+    The query embedding lands in CachedEmbeddings, so a miss costs no extra API call.
+    """
+    if not settings.ANSWER_CACHE_ENABLED or history:
+        return None, None
+
+    query_vector = await get_embedding_model().aembed_query(message)
+    cached = answer_cache.lookup(query_vector)
+    if cached is None:
+        return query_vector, None
+
+    append_history(session_id, [HumanMessage(content=message), AIMessage(content=cached.answer)])
+    # The escalation flag belongs to this message, not the one that filled the cache
+    return query_vector, cached.model_copy(update={
+        "session_id": session_id,
+        "needs_escalation": needs_escalation(message),
+    })
+
+
+def cacheable(result: AgentState) -> bool:
+    """
+    Only confident, grounded answers are worth reusing - never one that
+    stopped on a retry budget or says it has no information.
+    """
+    answer = result.get("answer")
+    return bool(
+        answer
+        and result.get("sources")
+        and not result.get("retry_reason")
+        and not is_low_confidence(answer)
+    )
+
+
+# ── Single-flight coalescing ──────────────────────────────────────────────────
+# During an outage hundreds of users send the same history-free question
+# within seconds. The first request (the leader) runs the agent; identical
+# requests that arrive while it is in flight await its result instead of
+# starting their own run. Keyed by normalized query + corpus version, so a
+# re-ingest never hands out an answer built from the old corpus.
+
+_in_flight: Dict[tuple, asyncio.Future] = {}
+
+
+def flight_key(message: str, history: list) -> Optional[tuple]:
+    """Coalescing key, or None when the turn depends on earlier history."""
+    if history:
+        return None
+    return normalize_text(message), corpus_version()
+
+
+def start_flight(key: tuple) -> asyncio.Future:
+    future = asyncio.get_running_loop().create_future()
+    # Mark a failure as retrieved even when nobody joined the flight
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _in_flight[key] = future
+    return future
+
+
+def finish_flight(key: tuple, future: asyncio.Future,
+                  response: Optional[ChatResponse] = None, error: Exception = None) -> None:
+    """
+    Publish the leader's outcome. A None response without an error means the
+    leader gave up (e.g. stream client disconnected) - one follower takes over.
+    """
+    if _in_flight.get(key) is future:
+        del _in_flight[key]
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(response)
+
+
+async def join_flight(key: Optional[tuple], session_id: str, message: str,
+                      mode: str) -> Optional[ChatResponse]:
+    """
+    Await an identical in-flight request and return its response for this
+    session (history saved), or None if there is nothing to join - the
+    caller then leads a new flight.
+
+    If the leader gives up (client disconnect) or exceeds
+    COALESCE_WAIT_TIMEOUT_S, followers do not all run the agent: the first
+    one to wake becomes the new leader and the rest join its flight. That
+    relies on the caller calling start_flight() with no await in between.
+    """
+    if key is None:
+        return None
+
+    while True:
+        future = _in_flight.get(key)
+        if future is None:
+            return None
+
+        logger.info("Coalescing with in-flight request | Session: %s", session_id)
+        try:
+            response = await asyncio.wait_for(asyncio.shield(future), settings.COALESCE_WAIT_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            # A stuck leader must not hold its followers forever: the first
+            # follower to time out retires its flight and takes over
+            logger.warning("Coalesced wait timed out after %.0fs | Session: %s",
+                           settings.COALESCE_WAIT_TIMEOUT_S, session_id)
+            if _in_flight.get(key) is future:
+                del _in_flight[key]
+            continue
+        if response is None:
+            continue
+
+        COALESCED_REQUESTS.labels(mode).inc()
+        append_history(session_id, [HumanMessage(content=message), AIMessage(content=response.answer)])
+        return response.model_copy(update={"session_id": session_id})
+
+
+def build_response(session_id: str, result: AgentState, processing_ms: int) -> ChatResponse:
+    raw_sources = result.get("sources", [])
+    return ChatResponse(
         session_id=session_id,
         answer=result.get("answer") or "I'm sorry, I couldn't process your request. Please try again.",
-        sources=sources,
+        sources=format_sources(raw_sources),
         intent=result.get("intent"),
         needs_escalation=result.get("needs_escalation", False),
-        confidence=confidence,
+        confidence=0.90 if raw_sources else 0.40,
         processing_time_ms=processing_ms,
+        retry_count=result.get("retry_count", 0),
+        retry_reason=result.get("retry_reason"),
     )
 
+
+def replay_events(response: ChatResponse, start_time: float) -> List[dict]:
+    """Stream events for an answer that is already complete (cache hit / coalesced)."""
+    sources = serialize_sources(response.sources)
+    return [
+        {"stage": "intent", "intent": response.intent},
+        {"stage": "sources", "sources": sources},
+        {"token": response.answer},
+        {
+            "done": True,
+            "answer": response.answer,
+            "intent": response.intent,
+            "sources": sources,
+            "needs_escalation": response.needs_escalation,
+            "processing_time_ms": int((time.time() - start_time) * 1000),
+            "retry_count": response.retry_count,
+            "retry_reason": response.retry_reason,
+        },
+    ]
+
+
+async def process_chat(session_id: str, message: str) -> ChatResponse:
+    """
+    Full chat Processing pipeline:
+       1. Load session history
+       2. Build initial Langgraph state
+       3. Invoke agent
+       4. Persist updated session history
+       5. Format and return ChatResponse
+    Args:
+         session_id: Unique session identifier from frontend
+         message: Current user query
+    
+    Returns:
+        ChatResponse Pydantic model ready for JSON serialization
+    """
+    start_time = time.time()
+    session_id_var.set(session_id)
+    version = corpus_version()      # the corpus this answer is built from
+    logger.info("Processing chat | Session: %s | Query: '%.60s...'", session_id, message)
+    # ── Step 1: Load session history ──────────────────────────────────────────
+    history = get_history(session_id)
+
+    query_vector, cached = await check_answer_cache(session_id, message, history)
+    if cached:
+        cached.processing_time_ms = int((time.time() - start_time) * 1000)
+        return cached
+
+    key = flight_key(message, history)
+    shared = await join_flight(key, session_id, message, "chat")
+    if shared:
+        shared.processing_time_ms = int((time.time() - start_time) * 1000)
+        return shared
+    future = start_flight(key) if key is not None else None
+
+    # ── Step 2: Build initial state ───────────────────────────────────────────
+    initial_state = build_initial_state(session_id, message, history)
+
+    # ── Step 3: Invoke agent (once admitted — see services/admission.py) ─────
+    try:
+        async with chat_admission.slot():
+            result: AgentState = await agent.ainvoke(initial_state)
+    except ServiceOverloadedError as e:
+        if future:
+            finish_flight(key, future, error=e)
+        raise
+    except Exception as e:
+        logger.error("Agent invocation failed: %s", e, exc_info=True)
+        error = AgentInvocationError(str(e))
+        if future:
+            finish_flight(key, future, error=error)
+        raise error
+    except BaseException:
+        if future:
+            finish_flight(key, future)
+        raise
+    
+    try:
+        # ── Step 4: Persist updated history ───────────────────────────────────
+        append_history(session_id, result.get("messages", [])[len(history):])
+
+        # ── Step 5: Format response ───────────────────────────────────────────
+        processing_ms = int((time.time() - start_time) * 1000)
+        response = build_response(session_id, result, processing_ms)
+
+        if future:
+            finish_flight(key, future, response)
+    finally:
+        # No-op once published; otherwise release followers (one takes over)
+        if future:
+            finish_flight(key, future)
+
+    if query_vector is not None and cacheable(result):
+        answer_cache.put(query_vector, response, version)
+
+    logger.info(
+        "Chat complete | Session: %s | Intent: %s | Sources: %d | Time: %dms",
+        session_id, response.intent, len(response.sources), processing_ms,
+    )
+
+    return response
+
+
+async def process_chat_batch(queries: List[ChatRequest]) -> AsyncIterator[BatchChatResult]:
+    """
+    Bulk variant of process_chat for QA/analytics replays. Yields one
+    BatchChatResult per query, in completion order (use `index` to match).
+
+    1. All messages are embedded in ONE batched embedding call
+       (aembed_queries). That fills the query tier of CachedEmbeddings, so the per-query embeddings in intent
+       classification, retrieval and the answer cache are all cache hits.
+    2. Queries run through process_chat with at most BATCH_MAX_CONCURRENCY
+       in flight - cache, coalescing and admission control apply as usual.
+       An item shed by admission control waits Retry-After and is re-queued
+       up to BATCH_OVERLOAD_RETRIES times.
+    3. A failing query yields an error line; the rest of the batch continues.
+    """
+    start_time = time.time()
+    logger.info("Processing batch | %d queries", len(queries))
+
+    try:
+        await get_embedding_model().aembed_queries([q.message for q in queries])
+    except Exception as e:
+        # Not fatal: each query embeds itself on the way through
+        logger.warning("Batch pre-embedding failed: %s", e)
+
+    semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+    async def run_one(index: int, query: ChatRequest) -> BatchChatResult:
+        async with semaphore:
+            for attempt in range(settings.BATCH_OVERLOAD_RETRIES + 1):
+                try:
+                    response = await process_chat(query.session_id, query.message)
+                    return BatchChatResult(index=index, session_id=query.session_id, response=response)
+                except ServiceOverloadedError as e:
+                    if attempt == settings.BATCH_OVERLOAD_RETRIES:
+                        error = e.message
+                    else:
+                        await asyncio.sleep(e.retry_after)
+                except Exception as e:
+                    error = getattr(e, "message", None) or str(e)
+                    break
+            return BatchChatResult(index=index, session_id=query.session_id, error=error)
+
+    tasks = [asyncio.create_task(run_one(i, q)) for i, q in enumerate(queries)]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            failed += result.error is not None
+            yield result
+    finally:
+        # Client went away mid-batch: stop the remaining queries
+        for task in tasks:
+            task.cancel()
+
     logger.info(
-        f"Chat complete | "
-        f"Session: {session_id} | "
-        f"Intent: {response.intent} | "
-        f"Sources: {len(sources)} | "
-        f"Time: {processing_ms}ms"
+        "Batch complete | %d queries | %d failed | Time: %dms",
+        len(queries), failed, int((time.time() - start_time) * 1000),
     )
 
-    return response
\ No newline at end of file
+
+async def stream_chat(session_id: str, message: str) -> AsyncIterator[dict]:
+    """
+    Streaming variant of process_chat. Yields event dicts as the graph runs:
+
+        {"stage": "accepted"}                    admitted, agent run starting
+        {"stage": "intent", "intent": ...}       classify_intent finished
+        {"stage": "sources", "sources": [...]}   rerank_documents finished
+        {"stage": "retry"}                       low confidence - answer restarts,
+                                                 discard tokens received so far
+        {"token": "..."}                         generate_answer LLM token
+        {"done": True, "sources": [...], ...}    final result; history saved
+
+    Tokens are forwarded from the generate_answer LLM call as they arrive
+    (LangGraph astream_events), so time-to-first-token is the LLM's own.
+    A semantic cache hit or a coalesced request is replayed as the same
+    event sequence. If admission control sheds the request, the generator
+    raises ServiceOverloadedError before yielding anything.
+    """
+    start_time = time.time()
+    session_id_var.set(session_id)
+    version = corpus_version()      # the corpus this answer is built from
+    logger.info("Streaming chat | Session: %s | Query: '%.60s...'", session_id, message)
+
+    history = get_history(session_id)
+
+    query_vector, cached = await check_answer_cache(session_id, message, history)
+    if cached:
+        for event in replay_events(cached, start_time):
+            yield event
+        return
+
+    key = flight_key(message, history)
+    shared = await join_flight(key, session_id, message, "stream")
+    if shared:
+        for event in replay_events(shared, start_time):
+            yield event
+        return
+    future = start_flight(key) if key is not None else None
+
+    initial_state = build_initial_state(session_id, message, history)
+    result: AgentState = None
+
+    try:
+        async with chat_admission.slot():
+            yield {"stage": "accepted"}
+            async for event in agent.astream_events(initial_state, version="v2"):
+                kind = event["event"]
+                node = event.get("metadata", {}).get("langgraph_node")
+
+                if kind == "on_chat_model_stream" and node == "generate_answer":
+                    token = event["data"]["chunk"].content
+                    if token:
+                        yield {"token": token}
+
+                elif kind == "on_chain_start" and event["name"] == "retrieve_documents":
+                    if (event["data"].get("input") or {}).get("iteration_count", 0) > 0:
+                        yield {"stage": "retry"}
+
+                elif kind == "on_chain_end" and event["name"] in STREAM_STAGES and node == event["name"]:
+                    output = event["data"].get("output") or {}
+                    if event["name"] == "classify_intent":
+                        yield {"stage": "intent", "intent": output.get("intent")}
+                    else:
+                        sources = format_sources(output.get("reranked_docs", []))
+                        yield {"stage": "sources", "sources": serialize_sources(sources)}
+
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    result = event["data"].get("output")
+
+        if not result:
+            raise AgentInvocationError("Agent stream ended without a final state")
+    except ServiceOverloadedError as e:
+        if future:
+            finish_flight(key, future, error=e)
+        raise
+    except Exception as e:
+        logger.error("Agent streaming failed: %s", e, exc_info=True)
+        error = e if isinstance(e, AgentInvocationError) else AgentInvocationError(str(e))
+        if future:
+            finish_flight(key, future, error=error)
+        raise error
+    except BaseException:
+        # Client disconnected mid-stream: let followers run on their own
+        if future:
+            finish_flight(key, future)
+        raise
+
+    try:
+        # ── Persist history once the stream completes ────────────────────────
+        append_history(session_id, result.get("messages", [])[len(history):])
+
+        processing_ms = int((time.time() - start_time) * 1000)
+        logger.info("Stream complete | Session: %s | Time: %dms", session_id, processing_ms)
+
+        response = build_response(session_id, result, processing_ms)
+        if future:
+            finish_flight(key, future, response)
+    finally:
+        # No-op once published; otherwise release followers (one takes over)
+        if future:
+            finish_flight(key, future)
+
+    if query_vector is not None and cacheable(result):
+        answer_cache.put(query_vector, response, version)
+
+    yield {
+        "done": True,
+        "answer": result.get("answer"),
+        "intent": result.get("intent"),
+        "sources": serialize_sources(response.sources),
+        "needs_escalation": result.get("needs_escalation", False),
+        "processing_time_ms": processing_ms,
+        "retry_count": result.get("retry_count", 0),
+        "retry_reason": result.get("retry_reason"),
+    }
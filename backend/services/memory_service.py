@@ -0,0 +1,88 @@
+"""
+services/memory_service.py
+--------------------------
+Rolling conversation summarization (MEMORY_MODE=summary).
+
+WHY:
+  In window mode up to MAX_HISTORY_TURNS*2 raw messages are replayed into
+  every generate_answer prompt, so long sessions get slower and pricier
+  each turn. In summary mode only the last MEMORY_RECENT_TURNS turns stay
+  verbatim; older turns are folded into a running summary stored with the
+  session.
+
+When it runs:
+  As a FastAPI background task after the response has been sent
+  (see api/routes/chat.py), so summarization never adds request latency.
+  Turns are folded in batches of MEMORY_FOLD_TURNS, not on every turn.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import HumanMessage
+
+from agent.prompts import SUMMARY_PROMPT
+from services.session_service import get_history, get_summary, fold_history
+from config import get_settings
+from core.logging import setup_logger
+from core.metrics import llm_metrics
+
+logger   = setup_logger(__name__)
+settings = get_settings()
+
+summary_llm = ChatOpenAI(
+    model=settings.CHAT_MODEL,
+    temperature=0,
+    max_tokens=settings.MEMORY_SUMMARY_MAX_TOKENS,
+    openai_api_key=settings.OPENAI_API_KEY,
+    stream_usage=True,          # usage_metadata on streamed calls too (token metrics)
+    callbacks=[llm_metrics],
+)
+
+# Sessions with a summarization pass in flight (one pass per session at a time)
+_in_flight: set = set()
+
+
+def summary_enabled() -> bool:
+    return settings.MEMORY_MODE == "summary"
+
+
+def format_transcript(messages: list) -> str:
+    return "\n".join(
+        f"{'Customer' if isinstance(m, HumanMessage) else 'Agent'}: {m.content}"
+        for m in messages
+    )
+
+
+async def summarize_session(session_id: str) -> None:
+    """
+    Fold all but the last MEMORY_RECENT_TURNS turns into the session summary,
+    once at least MEMORY_FOLD_TURNS older turns have accumulated.
+    Failures are logged and leave the history untouched.
+    """
+    if not summary_enabled() or session_id in _in_flight:
+        return
+
+    keep    = settings.MEMORY_RECENT_TURNS * 2
+    history = get_history(session_id)
+    if len(history) < keep + settings.MEMORY_FOLD_TURNS * 2:
+        return
+
+    folded = history[:len(history) - keep]
+    _in_flight.add(session_id)
+    try:
+        prompt = SUMMARY_PROMPT.format(
+            summary=get_summary(session_id) or "(none yet)",
+            transcript=format_transcript(folded),
+        )
+        response = await summary_llm.ainvoke([HumanMessage(content=prompt)])
+        if fold_history(session_id, folded, response.content.strip()):
+            logger.info("Session %s: folded %d messages into summary", session_id, len(folded))
+        else:
+            logger.info("Session %s: history changed during summarization — skipped", session_id)
+    except Exception as e:
+        logger.warning("Session %s: summarization failed: %s", session_id, e)
+    finally:
+        _in_flight.discard(session_id)
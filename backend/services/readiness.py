@@ -0,0 +1,110 @@
+"""
+services/readiness.py
+---------------------
+Background-refreshed readiness snapshot for /health and /health/ready.
+
+WHY:
+  Kubernetes probes every pod every few seconds. Counting the Chroma
+  collection (and, before the shared store, opening a PersistentClient)
+  on every probe was wasted work and sometimes slow enough to fail the
+  probe. The checks now run every HEALTH_REFRESH_INTERVAL_S in a
+  background task started by the lifespan, and probes only read the
+  last snapshot.
+
+Snapshot fields:
+  index_loaded    : persisted store exists and the vector store is open
+  chunk_count     : chunks in the collection
+  last_ingested_at: completion time of the last ingest run (INGEST_STAMP_PATH,
+                    written by ingest() even when nothing changed)
+  upstream_ok     : OpenAI API reachable (None if HEALTH_CHECK_UPSTREAM is off)
+  ready           : index loaded with chunks (and upstream_ok if HEALTH_REQUIRE_UPSTREAM)
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from openai import AsyncOpenAI
+
+from rag.store import get_store
+from config import get_settings
+from core.logging import setup_logger
+
+logger   = setup_logger(__name__)
+settings = get_settings()
+
+
+def _last_ingested_at() -> Optional[str]:
+    try:
+        return Path(settings.INGEST_STAMP_PATH).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _index_status() -> tuple:
+    """(index_loaded, chunk_count). Blocking - run in a worker thread."""
+    store = get_store()
+    if not store.is_ready():
+        return False, 0
+    store.vectorstore()
+    return True, store.collection().count()
+
+
+class ReadinessMonitor:
+    """Holds the latest snapshot; refresh() recomputes it."""
+
+    def __init__(self):
+        self._client: Optional[AsyncOpenAI] = None
+        self.snapshot: dict = {
+            "ready": False,
+            "index_loaded": False,
+            "chunk_count": 0,
+            "last_ingested_at": None,
+            "upstream_ok": None,
+            "checked_at": None,
+        }
+
+    async def _upstream_ok(self) -> Optional[bool]:
+        if not settings.HEALTH_CHECK_UPSTREAM:
+            return None
+        if self._client is None:
+            self._client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
+        try:
+            await self._client.models.retrieve(settings.CHAT_MODEL, timeout=settings.HEALTH_UPSTREAM_TIMEOUT_S)
+            return True
+        except Exception as e:
+            logger.warning("Readiness: OpenAI unreachable: %s", e)
+            return False
+
+    async def refresh(self) -> dict:
+        try:
+            index_loaded, chunk_count = await asyncio.to_thread(_index_status)
+        except Exception as e:
+            logger.error("Readiness: index check failed: %s", e)
+            index_loaded, chunk_count = False, 0
+
+        upstream_ok = await self._upstream_ok()
+        ready = index_loaded and chunk_count > 0
+        if settings.HEALTH_REQUIRE_UPSTREAM:
+            ready = ready and upstream_ok is not False
+
+        self.snapshot = {
+            "ready": ready,
+            "index_loaded": index_loaded,
+            "chunk_count": chunk_count,
+            "last_ingested_at": _last_ingested_at(),
+            "upstream_ok": upstream_ok,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+        }
+        return self.snapshot
+
+    async def run(self, interval: float = None) -> None:
+        """Refresh forever. Started (and cancelled) by main.py's lifespan."""
+        interval = interval or settings.HEALTH_REFRESH_INTERVAL_S
+        while True:
+            await self.refresh()
+            await asyncio.sleep(interval)
+
+
+readiness = ReadinessMonitor()
@@ -2,48 +2,280 @@
 services/session_service.py
 ----------------------------
 Manages conversation history per user session.
-Storage: In-memory dict (swap to Redis in production).
+
+Storage:
+  A pluggable SessionStore (default: InMemorySessionStore). The module
+  functions below are the only API the rest of the app uses, so a
+  Redis/disk-backed store can replace it via set_session_store().
+
+WHY a bounded store:
+  The original plain dict grew with every session id ever seen and only
+  shrank on DELETE /session. Sessions now expire after SESSION_TTL_SECONDS
+  idle, and the store is capped by entry count and approximate text size
+  with LRU eviction. A background sweeper (started in main.py's lifespan)
+  purges idle sessions even when nobody touches them.
+
+Messages are stored compactly as (role, text) tuples, not LangChain
+message objects, and rebuilt on read.
 """
 
 import sys
+import time
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from typing import List
-from langchain_core.messages import BaseMessage
+from typing import List, Optional, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from config import get_settings
 from core.logging import setup_logger
 
 logger = setup_logger(__name__)
 settings = get_settings()
 
-# In-memory session store — keyed by session_id
-_store: dict = {}
+# ── Compact message encoding ──────────────────────────────────────────────────
+
+_ROLE_OF = {HumanMessage: "human", AIMessage: "ai", SystemMessage: "system"}
+_CLASS_OF = {role: cls for cls, role in _ROLE_OF.items()}
+
+Encoded = Tuple[Tuple[str, str], ...]
+
+
+def encode_messages(messages: List[BaseMessage]) -> Encoded:
+    return tuple((_ROLE_OF.get(type(m), "human"), m.content) for m in messages)
+
+
+def decode_messages(encoded: Encoded) -> List[BaseMessage]:
+    return [_CLASS_OF[role](content=text) for role, text in encoded]
+
+
+class SessionRecord:
+    """One session: encoded messages, running summary, last access time."""
+
+    __slots__ = ("messages", "summary", "last_access", "size")
+
+    def __init__(self, messages: Encoded = (), summary: str = ""):
+        self.messages    = messages
+        self.summary     = summary
+        self.last_access = time.monotonic()
+        self.size        = len(summary) + sum(len(text) for _, text in messages)
+
+
+# ── Store interface ───────────────────────────────────────────────────────────
+
+class SessionStore(ABC):
+    """
+    Storage backend for SessionRecords. Implementations must be safe to call
+    from the event loop and from worker threads.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        ...
+
+    @abstractmethod
+    def put(self, session_id: str, record: SessionRecord) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Remove expired sessions. Returns how many were removed."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def stats(self) -> dict:
+        return {"active": len(self)}
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    LRU-ordered dict with idle TTL, an entry cap and an approximate
+    size cap (characters of message text + summary).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_chars: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_chars   = max_chars
+        self._lock  = threading.Lock()
+        self._data: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._chars = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _expired(self, record: SessionRecord, now: float) -> bool:
+        return now - record.last_access > self.ttl_seconds
+
+    def _remove(self, session_id: str) -> None:
+        self._chars -= self._data.pop(session_id).size
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            record = self._data.get(session_id)
+            if record is None:
+                return None
+            now = time.monotonic()
+            if self._expired(record, now):
+                self._remove(session_id)
+                self.expired += 1
+                return None
+            record.last_access = now
+            self._data.move_to_end(session_id)
+            return record
+
+    def put(self, session_id: str, record: SessionRecord) -> None:
+        with self._lock:
+            if session_id in self._data:
+                self._remove(session_id)
+            self._data[session_id] = record
+            self._chars += record.size
+            # Evict least recently used sessions, never the one just written
+            while len(self._data) > 1 and (
+                len(self._data) > self.max_entries or self._chars > self.max_chars
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evicted += 1
 
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._data:
+                return False
+            self._remove(session_id)
+            return True
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            # LRU order == last-access order, so stop at the first live session
+            while self._data:
+                session_id, record = next(iter(self._data.items()))
+                if not self._expired(record, now):
+                    break
+                self._remove(session_id)
+                removed += 1
+            self.expired += removed
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._data),
+            "chars": self._chars,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+_session_store: SessionStore = InMemorySessionStore(
+    ttl_seconds=settings.SESSION_TTL_SECONDS,
+    max_entries=settings.SESSION_MAX_ENTRIES,
+    max_chars=settings.SESSION_MAX_CHARS,
+)
+
+
+def get_session_store() -> SessionStore:
+    return _session_store
+
+
+def set_session_store(store: SessionStore) -> None:
+    """Swap the backend (e.g. a disk- or Redis-backed SessionStore)."""
+    global _session_store
+    _session_store = store
+
+
+# ── Session API ───────────────────────────────────────────────────────────────
 
 def get_history(session_id: str) -> List[BaseMessage]:
     """Retrieve conversation history for a session."""
-    history = _store.get(session_id, [])
-    logger.debug(f"Session {session_id}: loaded {len(history)} messages")
+    record = _session_store.get(session_id)
+    history = decode_messages(record.messages) if record else []
+    logger.debug("Session %s: loaded %d messages", session_id, len(history))
     return history
 
 
-def save_history(session_id: str, messages: List[BaseMessage]) -> None:
-    """Persist updated conversation history. Trims to MAX_HISTORY_TURNS."""
+def get_summary(session_id: str) -> str:
+    """Running summary of turns folded out of the history ("" if none)."""
+    record = _session_store.get(session_id)
+    return record.summary if record else ""
+
+
+def _save_encoded(session_id: str, messages: Encoded, summary: str) -> None:
     max_messages = settings.MAX_HISTORY_TURNS * 2
     trimmed = messages[-max_messages:] if len(messages) > max_messages else messages
-    _store[session_id] = trimmed
-    logger.debug(f"Session {session_id}: saved {len(trimmed)} messages")
+    _session_store.put(session_id, SessionRecord(trimmed, summary))
+    logger.debug("Session %s: saved %d messages", session_id, len(trimmed))
+
+
+def save_history(session_id: str, messages: List[BaseMessage]) -> None:
+    """Persist updated conversation history. Trims to MAX_HISTORY_TURNS."""
+    _save_encoded(session_id, encode_messages(messages), get_summary(session_id))
+
+
+def append_history(session_id: str, new_messages: List[BaseMessage]) -> None:
+    """
+    Append one turn to the stored history. Unlike save_history this does not
+    overwrite turns folded into the summary while the request was running.
+    """
+    record = _session_store.get(session_id)
+    messages = record.messages if record else ()
+    _save_encoded(session_id, messages + encode_messages(new_messages), record.summary if record else "")
+
+
+def fold_history(session_id: str, folded: List[BaseMessage], summary: str) -> bool:
+    """
+    Replace the oldest messages with a summary of them.
+
+    `folded` must still be the head of the stored history (the turns the
+    summary was computed from). If the session was cleared or trimmed in
+    the meantime, nothing is changed and False is returned.
+    """
+    record = _session_store.get(session_id)
+    if record is None:
+        return False
+    head = encode_messages(folded)
+    if record.messages[:len(head)] != head:
+        return False
+
+    _session_store.put(session_id, SessionRecord(record.messages[len(head):], summary))
+    logger.debug("Session %s: folded %d messages into summary", session_id, len(folded))
+    return True
 
 
 def clear_session(session_id: str) -> bool:
     """Delete session history. Returns True if existed."""
-    existed = session_id in _store
-    _store.pop(session_id, None)
-    logger.info(f"Session {session_id}: {'cleared' if existed else 'not found'}")
+    existed = _session_store.delete(session_id)
+    logger.info("Session %s: %s", session_id, "cleared" if existed else "not found")
     return existed
 
 
 def get_active_session_count() -> int:
     """Returns total number of active sessions."""
-    return len(_store)
\ No newline at end of file
+    return len(_session_store)
+
+
+# ── Background sweeper ────────────────────────────────────────────────────────
+
+async def run_session_sweeper(interval: float = None) -> None:
+    """Purge idle sessions every `interval` seconds. Started by the lifespan."""
+    interval = interval or settings.SESSION_SWEEP_INTERVAL_SECONDS
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = _session_store.sweep()
+            if removed:
+                logger.info("Session sweep: %d idle sessions expired | %d active", removed, len(_session_store))
+        except Exception as e:
+            logger.warning("Session sweep failed: %s", e)
@@ -69,6 +69,22 @@ export default function ChatWindow({ sessionId }) {
 
         setLoading(false);
 
+      },
+
+      () => {
+
+        // Low-confidence retry: the answer is regenerated from scratch
+        botContent = "";
+
+        setMessages(prev => {
+
+          const copy = [...prev];
+
+          copy[copy.length - 1].content = "";
+
+          return copy;
+        });
+
       }
 
     );
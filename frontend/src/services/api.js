@@ -24,7 +24,8 @@ export const streamMessage = async (
   message,
   onToken,
   onDone,
-  onError
+  onError,
+  onRetry
 ) => {
 
   try {
@@ -44,6 +45,12 @@ export const streamMessage = async (
       }
     );
 
+    // 429 (rate limit) / 503 (overloaded) arrive as a JSON error, not a stream
+    if (!response.ok) {
+      const body = await response.json().catch(() => ({}));
+      throw new Error(body.detail || `Request failed (${response.status})`);
+    }
+
     if (!response.body)
       throw new Error("No body");
 
@@ -79,6 +86,9 @@ export const streamMessage = async (
         const data =
           JSON.parse(line);
 
+        if (data.stage === "retry" && onRetry)
+          onRetry();
+
         if (data.token)
           onToken(data.token);
 
@@ -0,0 +1,108 @@
+"""
+scripts/bench_logging.py
+------------------------
+Measures what a log call costs the calling (event-loop) thread.
+
+Compares:
+  sync   - the previous setup: console StreamHandler + FileHandler on the
+           logger itself, formatted and written on the caller's thread
+  queue  - core.logging: one QueueHandler on the root logger; formatting
+           and I/O happen on the QueueListener thread
+  and, for a disabled DEBUG line, an eager f-string vs lazy %-args.
+
+Console output goes to /dev/null in both setups so the numbers compare
+handler overhead, not terminal speed.
+
+Usage:
+    python scripts/bench_logging.py --lines 50000
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import core.logging as core_logging
+from core.logging import configure_logging, shutdown_logging
+
+FMT = "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
+
+
+def per_call_us(logger: logging.Logger, n: int) -> float:
+    session, ms = "sess-1234", 812
+    start = time.perf_counter()
+    for i in range(n):
+        logger.info("Chat complete | Session: %s | Intent: %s | Sources: %d | Time: %dms",
+                    session, "billing", 3, ms + i)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def bench_sync(n: int) -> float:
+    logger = logging.getLogger("bench.sync")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    devnull = open(os.devnull, "w")
+    log_file = Path(tempfile.mkdtemp()) / "sync.log"
+    for handler in (logging.StreamHandler(devnull), logging.FileHandler(log_file, encoding="utf-8")):
+        handler.setFormatter(logging.Formatter(FMT))
+        logger.addHandler(handler)
+    try:
+        return per_call_us(logger, n)
+    finally:
+        for handler in logger.handlers:
+            handler.close()
+        devnull.close()
+
+
+def bench_queue(n: int) -> float:
+    sys.stdout = open(os.devnull, "w")      # listener's console handler binds stdout at configure time
+    # Never append benchmark records to the real backend/logs/rag_system.log
+    core_logging.LOG_FILE = Path(tempfile.mkdtemp()) / "queue.log"
+    try:
+        configure_logging()
+        result = per_call_us(logging.getLogger("bench.queue"), n)
+        shutdown_logging()                  # drains the queue; not counted
+        return result
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+
+
+def bench_disabled_debug(n: int) -> tuple:
+    logger = logging.getLogger("bench.debug")
+    logger.setLevel(logging.INFO)
+    docs = list(range(12))
+
+    start = time.perf_counter()
+    for _ in range(n):
+        logger.debug(f"Hybrid candidates | vector={len(docs)} | lexical={len(docs)}")
+    eager = (time.perf_counter() - start) / n * 1e6
+
+    start = time.perf_counter()
+    for _ in range(n):
+        logger.debug("Hybrid candidates | vector=%d | lexical=%d", len(docs), len(docs))
+    lazy = (time.perf_counter() - start) / n * 1e6
+    return eager, lazy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=50_000)
+    args = parser.parse_args()
+
+    sync  = bench_sync(args.lines)
+    queued = bench_queue(args.lines)
+    eager, lazy = bench_disabled_debug(args.lines * 4)
+
+    print(f"INFO, sync console+file handlers : {sync:6.2f} µs/call on caller thread")
+    print(f"INFO, queue handler              : {queued:6.2f} µs/call on caller thread")
+    print(f"DEBUG disabled, f-string         : {eager:6.2f} µs/call")
+    print(f"DEBUG disabled, lazy %-args      : {lazy:6.2f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+scripts/load_test.py
+--------------------
+Concurrency load test for POST /chat against a running backend.
+
+Sends the same batch of queries twice - once sequentially, once with N
+requests in flight - and reports latency percentiles and throughput.
+With async agent execution, concurrent throughput should scale with the
+number of in-flight requests (each one mostly waits on OpenAI I/O)
+instead of matching the sequential run.
+
+The per-IP rate limiter (30/min, burst 10) will reject most of a load
+test from one machine, and the semantic answer cache would serve the
+concurrent run from answers the sequential run stored. Start the
+backend with both disabled:
+
+    RATE_LIMIT_ENABLED=false ANSWER_CACHE_ENABLED=false uvicorn main:app --port 8000
+
+Every request also gets a unique message (run label + index appended),
+so neither the cache nor request coalescing can short-circuit it.
+
+Rejected (429) requests are counted separately and left out of the
+latency figures.
+
+Usage:
+    python scripts/load_test.py --url http://localhost:8000 --requests 20 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Optional
+
+import httpx
+
+QUERIES = [
+    "What does the Unlimited Plus plan include?",
+    "Why is my bill higher than usual this month?",
+    "I have no signal at home, what should I do?",
+    "How do I activate my eSIM?",
+    "How much does roaming in Europe cost?",
+    "How do I cancel my plan and get a refund?",
+    "How do I set up the APN on Android?",
+]
+
+
+async def send(client: httpx.AsyncClient, url: str, i: int, label: str) -> Optional[float]:
+    """Latency of one request, or None if it was rate limited."""
+    message = f"{QUERIES[i % len(QUERIES)]} (load test {label} #{i})"
+    start = time.perf_counter()
+    response = await client.post(
+        f"{url}/chat",
+        json={"session_id": f"load-{uuid.uuid4().hex[:8]}", "message": message},
+    )
+    if response.status_code == 429:
+        return None
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(url: str, total: int, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+    label = f"c{concurrency}-{uuid.uuid4().hex[:6]}"
+
+    async def bounded(client, i):
+        async with semaphore:
+            return await send(client, url, i, label)
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(bounded(client, i) for i in range(total)))
+        return latencies, time.perf_counter() - start
+
+
+def report(label: str, results: list, wall: float) -> float:
+    latencies = [r for r in results if r is not None]
+    limited = len(results) - len(latencies)
+    if limited:
+        print(f"{label:<12} | {limited} request(s) rate limited (429) - run the backend "
+              f"with RATE_LIMIT_ENABLED=false")
+    if not latencies:
+        return 0.0
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    throughput = len(latencies) / wall
+    print(
+        f"{label:<12} | wall {wall:6.2f}s | {throughput:5.2f} req/s | "
+        f"p50 {statistics.median(ordered) * 1000:7.0f}ms | p95 {p95 * 1000:7.0f}ms"
+    )
+    return throughput
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    sequential = report("sequential", *asyncio.run(run(args.url, args.requests, 1)))
+    concurrent = report(f"concurrent={args.concurrency}", *asyncio.run(run(args.url, args.requests, args.concurrency)))
+    if not sequential or not concurrent:
+        return
+    print(f"Speed-up: {concurrent / sequential:.1f}x (ideal ≈ {args.concurrency}x when I/O bound)")
+
+
+if __name__ == "__main__":
+    main()